@@ -31,17 +31,41 @@
 
 ################### IMPORT MODULES #######################
 
-import rclpy
 import sys
 import cv2
 import math
-import tf2_ros
+import json
+import time
+import warnings
+import queue
+import bisect
+import threading
+import contextlib
+import multiprocessing
+import yaml
 import numpy as np
-from rclpy.node import Node
-from cv_bridge import CvBridge, CvBridgeError
-from geometry_msgs.msg import TransformStamped
+from collections import deque, OrderedDict
+from multiprocessing import shared_memory, resource_tracker
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from scipy.spatial.transform import Rotation as R
-from sensor_msgs.msg import CompressedImage, Image
+
+# ROS 2 modules are only needed by the aruco_tf node. Without them, the detection and pose math
+# functions below can still be imported, Ex: by the offline benchmark in tools/
+try:
+    import rclpy
+    import tf2_ros
+    from rclpy.node import Node
+    from rclpy.executors import MultiThreadedExecutor, SingleThreadedExecutor
+    from rclpy.callback_groups import MutuallyExclusiveCallbackGroup
+    from rclpy.logging import LoggingSeverity
+    from diagnostic_msgs.msg import DiagnosticArray, DiagnosticStatus, KeyValue
+    from cv_bridge import CvBridge, CvBridgeError
+    from geometry_msgs.msg import TransformStamped
+    from sensor_msgs.msg import CameraInfo, CompressedImage, Image
+except ImportError:
+    rclpy = None
+    Node = object
 
 
 ##################### FUNCTION DEFINITIONS #######################
@@ -82,116 +106,1650 @@ def calculate_rectangle_area(coordinates):
     return area, width
 
 
-def detect_aruco(image):
+def calculate_rectangle_area_batch(corners):
     '''
-    Description:    Function to perform aruco detection and return each detail of aruco detected 
-                    such as marker ID, distance, angle, width, center point location, etc.
+    Description:    Vectorized version of calculate_rectangle_area for all markers of a frame at once
 
     Args:
-        image                   (Image):    Input image frame received from respective camera topic
+        corners     (numpy.ndarray):    stacked corners of detected arucos, shape (N,4,2)
 
     Returns:
-        center_aruco_list       (list):     Center points of all aruco markers detected
-        distance_from_rgb_list  (list):     Distance value of each aruco markers detected from RGB camera
-        angle_aruco_list        (list):     Angle of all pose estimated for aruco marker
-        width_aruco_list        (list):     Width of all detected aruco markers
-        ids                     (list):     List of all aruco marker IDs detected in a single frame 
+        areas       (numpy.ndarray):    area of each detected aruco, shape (N,)
+        widths      (numpy.ndarray):    width of each detected aruco, shape (N,)
     '''
 
-    ############ Function VARIABLES ############
+    # height is the 0->1 edge and width the 1->2 edge, same as calculate_rectangle_area()
+    heights = np.linalg.norm(corners[:, 0] - corners[:, 1], axis=1)
+    widths = np.linalg.norm(corners[:, 1] - corners[:, 2], axis=1)
 
-    # ->  You can remove these variables if needed. These are just for suggestions to let you get started
+    areas = heights * widths
 
-    # Use this variable as a threshold value to detect aruco markers of certain size.
-    # Ex: avoid markers/boxes placed far away from arm's reach position  
-    aruco_area_threshold = 1500
+    return areas, widths
 
-    # The camera matrix is defined as per camera info loaded from the plugin used. 
-    # You may get this from /camer_info topic when camera is spawned in gazebo.
-    # Make sure you verify this matrix once if there are calibration issues.
-    cam_mat = np.array([[931.1829833984375, 0.0, 640.0], [0.0, 931.1829833984375, 360.0], [0.0, 0.0, 1.0]])
 
-    # The distortion matrix is currently set to 0. 
-    # We will be using it during Stage 2 hardware as Intel Realsense Camera provides these camera info.
-    dist_mat = np.array([0.0,0.0,0.0,0.0,0.0])
+# numpy dtype and number of channels of the sensor_msgs/Image encodings handled by image_msg_to_array()
+IMAGE_ENCODINGS = {
+    'rgb8': (np.uint8, 3),
+    'bgr8': (np.uint8, 3),
+    'mono8': (np.uint8, 1),
+    'mono16': (np.uint16, 1),
+    '16UC1': (np.uint16, 1),
+    '32FC1': (np.float32, 1),
+}
 
-    # We are using 150x150 aruco marker size
-    size_of_aruco_m = 0.15
+# colour conversion to grayscale for each colour encoding
+GRAY_CONVERSIONS = {
+    'rgb8': cv2.COLOR_RGB2GRAY,
+    'bgr8': cv2.COLOR_BGR2GRAY,
+}
 
-    # You can remove these variables after reading the instructions. These are just for sample.
-    center_aruco_list = []
-    distance_from_rgb_list = []
-    angle_aruco_list = []
-    width_aruco_list = []
-    ids = []
- 
-    ############ ADD YOUR CODE HERE ############
 
-    # INSTRUCTIONS & HELP : 
+def image_msg_to_array(msg):
+    '''
+    Description:    Zero copy conversion of a sensor_msgs/Image to a numpy array.
+                    The returned array is a read-only view on msg.data using the row step of the message,
+                    a copy is only made when the data can not be viewed as is (big endian data on this machine,
+                    or a row step which is not a multiple of the pixel element size).
+
+    Args:
+        msg         (Image):            image message with one of the encodings of IMAGE_ENCODINGS
+
+    Returns:
+        frame       (numpy.ndarray):    read-only (height, width, channels) array, (height, width) for single channel encodings
+    '''
+
+    if msg.encoding not in IMAGE_ENCODINGS:
+        raise ValueError(f'Unsupported image encoding {msg.encoding}')
+
+    dtype, channels = IMAGE_ENCODINGS[msg.encoding]
+    dtype = np.dtype(dtype).newbyteorder('>' if msg.is_bigendian else '<')
+    buf = np.frombuffer(msg.data, dtype=np.uint8)
+
+    if msg.step % dtype.itemsize == 0:
+        frame = np.ndarray(shape=(msg.height, msg.width, channels), dtype=dtype, buffer=buf,
+                           strides=(msg.step, channels * dtype.itemsize, dtype.itemsize))
+    else:
+        # rows are not aligned to the element size, copy the pixel bytes of each row into a contiguous array
+        rows = buf[:msg.height * msg.step].reshape(msg.height, msg.step)[:, :msg.width * channels * dtype.itemsize]
+        frame = np.ascontiguousarray(rows).view(dtype).reshape(msg.height, msg.width, channels)
+
+    if not dtype.isnative:
+        frame = frame.astype(dtype.newbyteorder('='))
+
+    if channels == 1:
+        frame = frame[:, :, 0]
+
+    frame.flags.writeable = False
+    return frame
+
+
+def sample_marker_depth(depth_image, centers, patch_size=5, color_shape=None):
+    '''
+    Description:    Depth of each marker from the aligned depth image, vectorized over all markers.
+                    A patch_size x patch_size patch is sampled around each center, zeros and NaNs are rejected
+                    and the median of the remaining samples is taken.
+
+    Args:
+        depth_image (numpy.ndarray):    aligned depth image, 16UC1 (mm) or 32FC1 (m)
+        centers     (list):             [cx, cy] center of each marker in colour image pixels
+        patch_size  (int):              side of the sampled patch in pixels
+        color_shape (tuple):            (height, width) of the colour image if it differs from the depth image
+
+    Returns:
+        depths      (numpy.ndarray):    depth of each marker in meters, NaN when the patch has no valid sample
+    '''
+
+    centers = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+    height, width = depth_image.shape[:2]
+    if color_shape is not None and tuple(color_shape) != (height, width):
+        centers = centers * [width / color_shape[1], height / color_shape[0]]
+
+    half = patch_size // 2
+    offsets = np.arange(-half, half + 1)
+    cols = np.clip(np.rint(centers[:, 0])[:, np.newaxis] + offsets, 0, width - 1).astype(np.intp)      # (N, patch_size)
+    rows = np.clip(np.rint(centers[:, 1])[:, np.newaxis] + offsets, 0, height - 1).astype(np.intp)     # (N, patch_size)
+
+    patches = depth_image[rows[:, :, np.newaxis], cols[:, np.newaxis, :]].reshape(len(centers), -1).astype(np.float64)
+    patches[~(np.isfinite(patches) & (patches > 0))] = np.nan
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)                                 # all-NaN patches give NaN
+        depths = np.nanmedian(patches, axis=1)
+
+    if depth_image.dtype == np.uint16:
+        depths /= 1000.0                                                                # mm -> m
+
+    return depths
+
+
+DEPTH_FUSION_MODES = ('pnp', 'depth', 'consistent')                                  # modes of fuse_distances(), plus 'off' for the node
+
+
+def fuse_distances(pnp_distances, depth_distances, mode='consistent', tolerance=0.05):
+    '''
+    Description:    Choose between the PnP distance (from estimatePoseSingleMarkers) and the aligned depth of each marker
+
+    Args:
+        pnp_distances   (list):     distance of each marker from pose estimation (m)
+        depth_distances (list):     depth of each marker from sample_marker_depth(), NaN if not valid (m)
+        mode            (str):      'pnp':        PnP distance always wins (depth only cross-checked)
+                                    'depth':      depth wins whenever it is valid
+                                    'consistent': depth wins when valid and within tolerance of the PnP distance
+        tolerance       (float):    allowed difference between both distances (m)
+
+    Returns:
+        distances       (numpy.ndarray):    fused distance of each marker (m)
+        agree           (numpy.ndarray):    True where depth is valid and within tolerance of the PnP distance
+    '''
+
+    pnp_distances = np.asarray(pnp_distances, dtype=np.float64)
+    depth_distances = np.asarray(depth_distances, dtype=np.float64)
+
+    valid = np.isfinite(depth_distances)
+    agree = valid & (np.abs(np.where(valid, depth_distances, 0.0) - pnp_distances) <= tolerance)
+
+    if mode == 'depth':
+        use_depth = valid
+    elif mode == 'consistent':
+        use_depth = agree
+    elif mode == 'pnp':
+        use_depth = np.zeros_like(valid)
+    else:
+        raise ValueError(f'Unknown depth fusion mode {mode}')
+
+    return np.where(use_depth, depth_distances, pnp_distances), agree
+
+
+def transform_to_matrix(transform):
+    '''
+    Description:    Rotation matrix and translation vector of a geometry_msgs/Transform
+
+    Args:
+        transform   (Transform):        transform (Ex: TransformStamped.transform from lookup_transform)
+
+    Returns:
+        rotation    (numpy.ndarray):    3x3 rotation matrix
+        translation (numpy.ndarray):    translation vector, shape (3,)
+    '''
+
+    q = transform.rotation
+    t = transform.translation
+    return R.from_quat([q.x, q.y, q.z, q.w]).as_matrix(), np.array([t.x, t.y, t.z])
+
+
+def transform_to_record(t):
+    '''
+    Description:    TransformStamped as a plain dict, with a stable key order so that outputs of two runs can be compared byte for byte
+
+    Args:
+        t           (TransformStamped):     transform
+
+    Returns:
+        record      (dict):     stamp [sec, nanosec], frame_id, child_frame_id, translation [x, y, z], rotation [x, y, z, w]
+    '''
+
+    translation, rotation = t.transform.translation, t.transform.rotation
+    return {'stamp': [t.header.stamp.sec, t.header.stamp.nanosec],
+            'frame_id': t.header.frame_id,
+            'child_frame_id': t.child_frame_id,
+            'translation': [translation.x, translation.y, translation.z],
+            'rotation': [rotation.x, rotation.y, rotation.z, rotation.w]}
+
+
+def compose_positions(rotation, translation, positions):
+    '''
+    Description:    Express positions given in a child frame in the parent frame, for all positions at once
+
+    Args:
+        rotation    (numpy.ndarray):    3x3 rotation of the child frame in the parent frame
+        translation (numpy.ndarray):    origin of the child frame in the parent frame, shape (3,)
+        positions   (numpy.ndarray):    positions in the child frame, shape (N,3)
+
+    Returns:
+        positions   (numpy.ndarray):    positions in the parent frame, shape (N,3)
+    '''
+
+    return np.asarray(positions, dtype=np.float64) @ rotation.T + translation
+
+
+def marker_yaw_batch(rvecs):
+    '''
+    Description:    Yaw of markers from their rotation vectors, taken from the rotation matrix instead of the
+                    z component of the rotation vector. Yaw is the angle of the marker normal (its z axis) around
+                    the camera y axis, 0 when the marker faces the camera, with the same sign as rvec[2] for small angles.
+                    Only the third column of each rotation matrix is needed, computed with Rodrigues' formula for all markers at once.
+
+    Args:
+        rvecs       (numpy.ndarray):    (N,3) rotation vectors from 'estimatePoseSingleMarkers'
+
+    Returns:
+        yaw         (numpy.ndarray):    (N,) yaw of each marker (radians)
+    '''
+
+    rvecs = np.asarray(rvecs, dtype=np.float64).reshape(-1, 3)
+    theta = np.linalg.norm(rvecs, axis=1)
+    k = rvecs / np.where(theta > 1e-12, theta, 1.0)[:, np.newaxis]
+    sin, one_minus_cos = np.sin(theta), 1.0 - np.cos(theta)
+
+    # R @ [0, 0, 1] = cos(theta) e_z + sin(theta) (k x e_z) + (1 - cos(theta)) k_z k
+    normal_x = sin * k[:, 1] + one_minus_cos * k[:, 0] * k[:, 2]
+    normal_z = 1.0 - one_minus_cos * (1.0 - k[:, 2] ** 2)
+
+    return np.arctan2(normal_x, -normal_z)
+
+
+def correct_aruco_angle_batch(angle_aruco):
+    '''
+    Description:    Vectorized correction formula applied in float (no int truncation) to the yaw of all markers.
+                    The formula is expressed in degrees, the angles are converted to and back from degrees around it.
+
+    Args:
+        angle_aruco     (numpy.ndarray):    (N,) yaw of the markers (radians, see marker_yaw_batch())
+
+    Returns:
+        angle_aruco     (numpy.ndarray):    (N,) corrected yaw (radians)
+    '''
+
+    #       angle_aruco = (0.788*angle_aruco) - ((angle_aruco**2)/3160)
+    angle_deg = np.degrees(np.asarray(angle_aruco, dtype=np.float64))
+    return np.radians((0.788*angle_deg) - ((angle_deg**2)/3160))
+
+
+def aruco_angles_to_quaternions(angle_aruco):
+    '''
+    Description:    Quaternions of all markers from roll pitch yaw (where, roll and pitch are 0 while yaw is corrected aruco_angle),
+                    one 'from_euler' call for all markers
+
+    Args:
+        angle_aruco     (numpy.ndarray):    (N,) corrected yaw of the markers (radians)
+
+    Returns:
+        quats           (numpy.ndarray):    (N,4) (qx, qy, qz, qw) of each marker
+    '''
+
+    angle_aruco = np.asarray(angle_aruco, dtype=np.float64)
+    if angle_aruco.size == 0:
+        return np.empty((0, 4))
+    euler = np.empty((angle_aruco.size, 3))
+    euler[:, 0] = math.pi/2
+    euler[:, 1] = 0.0
+    euler[:, 2] = (math.pi/2) - angle_aruco
+    return R.from_euler('xyz', euler).as_quat()
+
+
+def back_project_batch(centers, distances, detector):
+    '''
+    Description:    Marker centers in pixels and distances from the camera to positions in camera_link for all markers at once
+                    (pinhole back projection around the principal point (centerCamX, centerCamY) of the intrinsics, which
+                    is not the image center for calibrated cameras, followed by the x,y,z = z,x,y axis swap)
+
+    Args:
+        centers     (numpy.ndarray):    (N,2) marker centers (pixels)
+        distances   (numpy.ndarray):    (N,) distance of each marker from the camera (m)
+        detector    (ArucoDetector):    provides the camera intrinsics
+
+    Returns:
+        positions   (numpy.ndarray):    (N,3) x, y, z of each marker in camera_link
+    '''
+
+    centers = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+    distances = np.asarray(distances, dtype=np.float64)
+
+    positions = np.empty((distances.size, 3))
+    positions[:, 0] = distances
+    positions[:, 1] = distances * (detector.centerCamX - centers[:, 0]) / detector.focalX
+    positions[:, 2] = distances * (detector.centerCamY - centers[:, 1]) / detector.focalY
+    return positions
+
+
+# cv2.aruco.DetectorParameters of each detector profile (see ArucoDetector.configure()).
+# Adaptive thresholding runs once per window size from WinSizeMin to WinSizeMax by WinSizeStep and dominates detection cost.
+# 'default' keeps the OpenCV defaults (windows 3, 13, 23, no corner refinement).
+DETECTOR_PROFILES = {
+    'default': {},
+    'fast': {                                                                           # single threshold window, only markers large enough to pass the area threshold
+        'adaptiveThreshWinSizeMin': 7,
+        'adaptiveThreshWinSizeMax': 7,
+        'adaptiveThreshWinSizeStep': 10,
+        'minMarkerPerimeterRate': 0.08,
+        'polygonalApproxAccuracyRate': 0.05,
+        'cornerRefinementMethod': cv2.aruco.CORNER_REFINE_NONE,
+    },
+    'balanced': {
+        'adaptiveThreshWinSizeMin': 5,
+        'adaptiveThreshWinSizeMax': 15,
+        'adaptiveThreshWinSizeStep': 5,
+        'minMarkerPerimeterRate': 0.05,
+        'polygonalApproxAccuracyRate': 0.04,
+        'cornerRefinementMethod': cv2.aruco.CORNER_REFINE_SUBPIX,
+        'cornerRefinementWinSize': 5,
+    },
+    'accurate': {                                                                       # more windows for uneven lighting, subpixel corners for the pose
+        'adaptiveThreshWinSizeMin': 3,
+        'adaptiveThreshWinSizeMax': 33,
+        'adaptiveThreshWinSizeStep': 5,
+        'minMarkerPerimeterRate': 0.02,
+        'polygonalApproxAccuracyRate': 0.03,
+        'perspectiveRemovePixelPerCell': 8,
+        'cornerRefinementMethod': cv2.aruco.CORNER_REFINE_SUBPIX,
+        'cornerRefinementWinSize': 5,
+        'cornerRefinementMaxIterations': 50,
+        'cornerRefinementMinAccuracy': 0.01,
+    },
+}
+
+
+##################### CLASS DEFINITION #######################
+
+class ArucoDetector():
+    '''
+    ___CLASS___
+
+    Description:    Reusable aruco detector. The aruco dictionary, detector parameters and camera intrinsics are built once
+                    and the intrinsics are only refreshed when the camera info actually changes, instead of rebuilding
+                    all of them on every frame.
+    '''
+
+    def __init__(self, aruco_area_threshold=1500, size_of_aruco_m=0.15, batched=True, pyramid_scale=1.0, refine_window=5,
+                 dictionary='DICT_4X4_50', profile='default', detector_params=None):
+        '''
+        Description:    Initialization of class ArucoDetector
+
+        Args:
+            aruco_area_threshold    (float):    markers with a smaller area (in pixels) are ignored
+            size_of_aruco_m         (float):    side length of the aruco markers in meters
+            batched                 (bool):     use the vectorized detect_batched() path in detect()
+            pyramid_scale           (float):    detect on a frame downscaled by this factor (Ex: 0.5, 0.25) and refine
+                                                corners at full resolution, 1.0 to detect at full resolution
+            refine_window           (int):      half size of the full resolution corner refinement window (pixels)
+            dictionary              (str):      name of the predefined cv2.aruco dictionary (Ex: 'DICT_4X4_50')
+            profile                 (str):      detector profile, key of DETECTOR_PROFILES
+            detector_params         (dict):     cv2.aruco.DetectorParameters attributes overriding the profile
+        '''
+
+        # Use this variable as a threshold value to detect aruco markers of certain size.
+        # Ex: avoid markers/boxes placed far away from arm's reach position  
+        self.aruco_area_threshold = aruco_area_threshold
+
+        # We are using 150x150 aruco marker size
+        self.size_of_aruco_m = size_of_aruco_m
+
+        self.batched = batched
+        self.pyramid_scale = pyramid_scale
+        self.refine_window = refine_window
+        self.refine_criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_COUNT, 30, 0.1)
+
+        # held while detecting and while intrinsics / encoding are replaced, so a frame never mixes old and new intrinsics
+        # (camera info and image callbacks may run alongside detection under the MultiThreadedExecutor)
+        self.lock = threading.RLock()
+
+        # encoding of the colour frames (key of GRAY_CONVERSIONS) and grayscale buffer reused across frames
+        self.color_encoding = 'rgb8'
+        self.gray = None
+
+        # (N,4,2) corners of the markers returned by the last detect call, in the same order as the returned ids
+        self.last_corners = np.empty((0, 4, 2), dtype=np.float32)
+
+        # (N,) ids and (N,3) rvecs / tvecs of the same markers, to annotate a copy of the frame later (see draw_detections())
+        self.clear_last_poses()
+
+        # draw detected markers and axes on writeable frames, False for headless use or when annotating a copy
+        self.draw = True
+
+        # optional object with a stage(name) context manager, timing grayscale / detection / area_filter / pose
+        self.stage_timer = None
+
+        # number of markers found by the last detect call, before the area threshold
+        self.last_found = 0
+
+        # optional logger for per frame messages (printed without one)
+        self.logger = None
+
+        #   ->  Use these aruco parameters-
+        #       ->  Dictionary: 4x4_50 (4x4 only until 50 aruco IDs) by default
+        self.dictionary = dictionary
+        self.aruco_dict = cv2.aruco.getPredefinedDictionary(getattr(cv2.aruco, dictionary))
+        self.configure(profile, detector_params)
+
+        # The camera matrix is defined as per camera info loaded from the plugin used (1280x720 gazebo camera).
+        # It is replaced by the /camera/camera_info topic or a calibration yaml as soon as one of them is available.
+        # The distortion matrix is currently set to 0. 
+        # We will be using it during Stage 2 hardware as Intel Realsense Camera provides these camera info.
+        self.cam_mat = None
+        self.dist_mat = None
+        self.set_intrinsics(np.array([[931.1829833984375, 0.0, 640.0], [0.0, 931.1829833984375, 360.0], [0.0, 0.0, 1.0]]),
+                            np.array([0.0,0.0,0.0,0.0,0.0]), 1280, 720)
+
+
+    def set_intrinsics(self, cam_mat, dist_mat, width, height):
+        '''
+        Description:    Update camera intrinsics and the values derived from them (image size, center, focal length).
+                        Raises ValueError and keeps the intrinsics in use when the focal lengths or the image size are
+                        not positive (Ex: all-zero K of an uncalibrated camera driver).
+
+        Args:
+            cam_mat     (numpy.ndarray):    3x3 camera matrix
+            dist_mat    (numpy.ndarray):    distortion coefficients
+            width       (int):              image width in pixels
+            height      (int):              image height in pixels
+
+        Returns:
+            changed     (bool):             True if the intrinsics differ from the ones in use
+        '''
+
+        cam_mat = np.asarray(cam_mat, dtype=np.float64).reshape(3, 3)
+        dist_mat = np.asarray(dist_mat, dtype=np.float64).ravel()
+        if dist_mat.size == 0:
+            dist_mat = np.zeros(5)
+
+        # a singular camera matrix would make back projection divide by zero and broadcast inf / nan transforms
+        if not (np.all(np.isfinite(cam_mat)) and cam_mat[0, 0] > 0 and cam_mat[1, 1] > 0 and width > 0 and height > 0):
+            raise ValueError(f'Invalid camera intrinsics: fx={cam_mat[0, 0]}, fy={cam_mat[1, 1]}, size {width}x{height}')
+
+        if (self.cam_mat is not None and np.array_equal(cam_mat, self.cam_mat) and np.array_equal(dist_mat, self.dist_mat)
+                and (width, height) == (self.sizeCamX, self.sizeCamY)):
+            return False
+
+        with self.lock:
+            self.cam_mat = cam_mat
+            self.dist_mat = dist_mat
+
+            # These are the variables defined from camera info topic such as image pixel size, focalX, focalY, etc.
+            # You can find more on these variables here -> http://docs.ros.org/en/melodic/api/sensor_msgs/html/msg/CameraInfo.html
+            self.sizeCamX = int(width)
+            self.sizeCamY = int(height)
+            self.centerCamX = cam_mat[0, 2]
+            self.centerCamY = cam_mat[1, 2]
+            self.focalX = cam_mat[0, 0]
+            self.focalY = cam_mat[1, 1]
+
+        return True
+
+
+    def set_intrinsics_from_camera_info(self, msg):
+        '''
+        Description:    Update camera intrinsics from a sensor_msgs/CameraInfo message
+
+        Args:
+            msg         (CameraInfo):   camera info received from camera info topic
+
+        Returns:
+            changed     (bool):         True if the intrinsics differ from the ones in use
+        '''
+
+        return self.set_intrinsics(np.array(msg.k), np.array(msg.d), msg.width, msg.height)
+
+
+    def load_intrinsics_yaml(self, path):
+        '''
+        Description:    Update camera intrinsics from a camera calibration yaml file
+                        (same layout as written by camera_calibration / camera_info_manager)
+
+        Args:
+            path        (str):          path of the yaml file
+
+        Returns:
+            changed     (bool):         True if the intrinsics differ from the ones in use
+        '''
+
+        with open(path) as f:
+            calib = yaml.safe_load(f)
+
+        return self.set_intrinsics(np.array(calib['camera_matrix']['data']),
+                                   np.array(calib.get('distortion_coefficients', {}).get('data', [])),
+                                   calib['image_width'], calib['image_height'])
+
+
+    def configure(self, profile='default', detector_params=None):
+        '''
+        Description:    Build the detector parameters from a profile and explicit overrides
+
+        Args:
+            profile         (str):      key of DETECTOR_PROFILES
+            detector_params (dict):     cv2.aruco.DetectorParameters attributes applied over the profile
+        '''
+
+        if profile not in DETECTOR_PROFILES:
+            raise ValueError(f'Unknown detector profile {profile}')
+
+        self.profile = profile
+        self.detector_params = dict(detector_params or {})
+        self.params = cv2.aruco.DetectorParameters_create()
+        for name, value in {**DETECTOR_PROFILES[profile], **self.detector_params}.items():
+            if not hasattr(self.params, name):
+                raise ValueError(f'Unknown detector parameter {name}')
+            setattr(self.params, name, value)
+
+
+    def clear_last_poses(self):
+        self.last_ids = np.empty((0,), dtype=np.int32)
+        self.last_rvecs = np.empty((0, 3))
+        self.last_tvecs = np.empty((0, 3))
+
+
+    def stage(self, name):
+        '''
+        Description:    Context manager timing a stage of the detection with stage_timer (does nothing without one)
+
+        Args:
+            name        (str):      name of the stage
+        '''
+
+        if self.stage_timer is None:
+            return contextlib.nullcontext()
+        return self.stage_timer.stage(name)
+
+
+    def to_gray(self, image):
+        '''
+        Description:    Convert a colour frame to grayscale into a buffer which is reused as long as the frame size does not change
+
+        Args:
+            image       (numpy.ndarray):    colour frame (encoding as per self.color_encoding) or grayscale frame
+
+        Returns:
+            gray        (numpy.ndarray):    grayscale frame, only valid until the next call
+        '''
+
+        if image.ndim == 2:
+            return image
+
+        if self.gray is None or self.gray.shape != image.shape[:2]:
+            self.gray = np.empty(image.shape[:2], dtype=np.uint8)
+
+        cv2.cvtColor(image, GRAY_CONVERSIONS.get(self.color_encoding, cv2.COLOR_RGB2GRAY), dst=self.gray)
+        return self.gray
+
+
+    def find_markers(self, image, rois=None):
+        '''
+        Description:    Convert frame to grayscale, detect markers and draw them on the frame
+                        (nothing is drawn when draw is False or on read-only frames, Ex: zero copy frames from image_msg_to_array())
+
+        Args:
+            image       (Image):    Input image frame received from respective camera topic
+            rois        (list):     (x0, y0, x1, y1) regions to search in, None to scan the full frame
+
+        Returns:
+            corners     (tuple):    corners of detected arucos as returned by 'detectMarkers'
+            ids_list    (list):     ids of detected arucos as returned by 'detectMarkers' (None if nothing detected)
+        '''
+
+        #	->  Convert input BGR image to GRAYSCALE for aruco detection
+        with self.stage('grayscale'):
+            gray = self.to_gray(image)
+
+        #   ->  Detect aruco marker in the image and store 'corners' and 'ids'
+        #       ->  HINT: Handle cases for empty markers detection. 
+        with self.stage('detection'):
+            if rois is not None:
+                corners, ids_list = self.find_markers_in_rois(gray, rois)
+                self.last_found = 0 if ids_list is None else len(ids_list)
+            elif self.pyramid_scale < 1.0:
+                corners, ids_list = self.find_markers_coarse(gray)                      # sets last_found before its area filtering
+            else:
+                corners,ids_list,empty_markers = cv2.aruco.detectMarkers(gray,self.aruco_dict,parameters=self.params)
+                self.last_found = 0 if ids_list is None else len(ids_list)
+
+        #   ->  Draw detected marker on the image frame which will be shown later
+        if self.draw and image.flags.writeable:
+            cv2.aruco.drawDetectedMarkers(image, corners, ids_list)
+
+        if ids_list is None:
+            if self.logger is None:
+                print("No ArUco marker detected")
+            else:
+                self.logger.debug("No ArUco marker detected")
+
+        return corners, ids_list
+
+
+    def find_markers_coarse(self, gray):
+        '''
+        Description:    Detect markers on the frame downscaled by pyramid_scale, where markers below the area threshold
+                        mostly vanish, then map the corners of the remaining markers back to full resolution and refine
+                        them with subpixel corner refinement on small full resolution patches.
+                        last_found counts the markers detected before the area threshold.
+
+        Args:
+            gray        (numpy.ndarray):    full resolution grayscale frame
+
+        Returns:
+            corners     (tuple):            refined full resolution corners, same layout as 'detectMarkers'
+            ids_list    (numpy.ndarray):    (N,1) ids of detected arucos (None if nothing detected)
+        '''
+
+        scale = self.pyramid_scale
+        small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        corners, ids_list, _ = cv2.aruco.detectMarkers(small, self.aruco_dict, parameters=self.params)
+        self.last_found = 0 if ids_list is None else len(ids_list)
+        if ids_list is None:
+            return corners, None
+
+        # pixel centers of the downscaled frame back to full resolution
+        all_corners = (np.concatenate(corners, axis=0) + 0.5) / scale - 0.5
+
+        # markers under the area threshold are dropped later anyway, don't pay for their refinement
+        areas, _ = calculate_rectangle_area_batch(all_corners)
+        keep = areas >= self.aruco_area_threshold
+        if not np.any(keep):
+            return (), None
+
+        refined = np.ascontiguousarray(all_corners[keep], dtype=np.float32).reshape(-1, 1, 2)
+        cv2.cornerSubPix(gray, refined, (self.refine_window, self.refine_window), (-1, -1), self.refine_criteria)
+
+        return tuple(refined.reshape(-1, 1, 4, 2)), ids_list[keep]
+
+
+    def find_markers_in_rois(self, gray, rois):
+        '''
+        Description:    Detect markers only inside the given regions of the grayscale frame.
+                        Corners are shifted back to full frame coordinates, a marker found in several
+                        overlapping regions is only kept once.
+
+        Args:
+            gray        (numpy.ndarray):    grayscale frame
+            rois        (list):             (x0, y0, x1, y1) regions to search in
+
+        Returns:
+            corners     (tuple):    corners of detected arucos, same layout as 'detectMarkers'
+            ids_list    (numpy.ndarray):    (N,1) ids of detected arucos (None if nothing detected)
+        '''
+
+        found = {}
+        for x0, y0, x1, y1 in rois:
+            if x1 - x0 < 2 or y1 - y0 < 2:
+                continue
+            roi_corners, roi_ids, _ = cv2.aruco.detectMarkers(gray[y0:y1, x0:x1], self.aruco_dict, parameters=self.params)
+            if roi_ids is None:
+                continue
+            for marker_corners, marker_id in zip(roi_corners, roi_ids[:, 0]):
+                if marker_id not in found:
+                    found[marker_id] = marker_corners + np.array([x0, y0], dtype=np.float32)
+
+        if not found:
+            return (), None
+
+        return tuple(found.values()), np.array(list(found.keys()), dtype=np.int32).reshape(-1, 1)
+
+
+    def detect(self, image, rois=None):
+        '''
+        Description:    Detect arucos using the batched or the per marker path (see detect_loop() for the return values)
+        '''
+
+        with self.lock:
+            if self.batched:
+                return self.detect_batched(image, rois)
+            return self.detect_loop(image, rois)
+
+
+    def detect_loop(self, image, rois=None):
+        '''
+        Description:    Function to perform aruco detection and return each detail of aruco detected 
+                        such as marker ID, distance, angle, width, center point location, etc.
+
+        Args:
+            image                   (Image):    Input image frame received from respective camera topic
+            rois                    (list):     (x0, y0, x1, y1) regions to search in, None to scan the full frame
+
+        Returns:
+            center_aruco_list       (list):     Center points of all aruco markers detected
+            distance_from_rgb_list  (list):     Distance value of each aruco markers detected from RGB camera
+            angle_aruco_list        (list):     Yaw of all pose estimated for aruco marker (radians, see marker_yaw_batch())
+            width_aruco_list        (list):     Width of all detected aruco markers
+            ids                     (list):     List of all aruco marker IDs detected in a single frame 
+        '''
+
+        center_aruco_list = []
+        distance_from_rgb_list = []
+        angle_aruco_list = []
+        width_aruco_list = []
+        ids = []
+        kept_corners = []
+        rvecs = []
+        tvecs = []
+
+        corners, ids_list = self.find_markers(image, rois)
+
+        #   ->  Loop over each marker ID detected in frame and calculate area using function defined above (calculate_rectangle_area(coordinates))
+        if ids_list is not None:
+            for i in range(len(ids_list)):
+                area,width = calculate_rectangle_area(corners[i][0])
+                #   ->  Remove tags which are far away from arm's reach positon based on some threshold defined
+                if(area<self.aruco_area_threshold):
+                    continue
+                else:
+                    #->  Calculate center points aruco list using math and distance from RGB camera using pose estimation of aruco marker
+                    #->  HINT: You may use numpy for center points and 'estimatePoseSingleMarkers' from cv2 aruco library for pose estimation
+
+                    cx = np.mean(corners[i][0][:,0])
+                    cy = np.mean(corners[i][0][:,1])
+                    center_aruco_list.append([cx,cy])
+                    rvec, tvec, _ = cv2.aruco.estimatePoseSingleMarkers(corners[i], self.size_of_aruco_m, self.cam_mat, self.dist_mat)
+                    distance_from_rgb = np.sqrt(tvec[0][0][0]**2 + tvec[0][0][1]**2 + tvec[0][0][2]**2)
+                    distance_from_rgb_list.append(distance_from_rgb)
+
+                    # Calculate the angle of the ArUco marker
+                    angle_aruco = marker_yaw_batch(rvec[0])[0] # yaw
+                    angle_aruco_list.append(angle_aruco)
+
+                    # Append marker width and ID
+                    width_aruco_list.append(width)
+                    ids.append(ids_list[i][0])
+                    kept_corners.append(corners[i][0])
+                    rvecs.append(rvec[0][0])
+                    tvecs.append(tvec[0][0])
+
+                    #->  Draw frame axes from coordinates received using pose estimation
+                    if self.draw and image.flags.writeable:
+                        cv2.aruco.drawAxis(image, self.cam_mat, self.dist_mat, rvec, tvec, self.size_of_aruco_m)
+
+        self.last_corners = np.array(kept_corners, dtype=np.float32).reshape(-1, 4, 2)
+        self.last_ids = np.array(ids, dtype=np.int32)
+        self.last_rvecs = np.array(rvecs).reshape(-1, 3)
+        self.last_tvecs = np.array(tvecs).reshape(-1, 3)
+
+        return center_aruco_list, distance_from_rgb_list, angle_aruco_list, width_aruco_list, ids
+
+
+    def detect_batched(self, image, rois=None):
+        '''
+        Description:    Batched version of detect_loop. All detected corners are stacked into a single (N,4,2) array,
+                        areas, widths, centers and the area threshold mask are computed with numpy in one pass and
+                        pose estimation runs once for all markers which survive the threshold.
+
+        Args:
+            image                   (Image):    Input image frame received from respective camera topic
+            rois                    (list):     (x0, y0, x1, y1) regions to search in, None to scan the full frame
+
+        Returns:
+            Same five lists as detect_loop (center_aruco_list, distance_from_rgb_list, angle_aruco_list, width_aruco_list, ids)
+        '''
+
+        self.last_corners = np.empty((0, 4, 2), dtype=np.float32)
+        self.clear_last_poses()
+
+        corners, ids_list = self.find_markers(image, rois)
+        if ids_list is None:
+            return [], [], [], [], []
+
+        with self.stage('area_filter'):
+            # (N,1,4,2) tuple from detectMarkers -> single (N,4,2) array
+            all_corners = np.concatenate(corners, axis=0)
+            areas, widths = calculate_rectangle_area_batch(all_corners)
+
+            #   ->  Remove tags which are far away from arm's reach positon based on some threshold defined
+            keep = areas >= self.aruco_area_threshold
+            if not np.any(keep):
+                return [], [], [], [], []
+
+            kept_corners = all_corners[keep]
+            centers = kept_corners.mean(axis=1)
+            self.last_corners = kept_corners
+
+        with self.stage('pose'):
+            # one estimatePoseSingleMarkers call for every surviving marker, corners passed in the same (1,4,2) layout as detectMarkers
+            rvecs, tvecs, _ = cv2.aruco.estimatePoseSingleMarkers(list(kept_corners[:, np.newaxis]), self.size_of_aruco_m, self.cam_mat, self.dist_mat)
+            distances = np.linalg.norm(tvecs[:, 0, :], axis=1)
+            angles = marker_yaw_batch(rvecs[:, 0, :])                                   # yaw, same as detect_loop
+
+        self.last_ids = ids_list[keep, 0]
+        self.last_rvecs = rvecs[:, 0, :]
+        self.last_tvecs = tvecs[:, 0, :]
+
+        if self.draw and image.flags.writeable:
+            for rvec, tvec in zip(rvecs, tvecs):
+                cv2.aruco.drawAxis(image, self.cam_mat, self.dist_mat, rvec, tvec, self.size_of_aruco_m)
+
+        return centers.tolist(), distances.tolist(), angles.tolist(), widths[keep].tolist(), ids_list[keep, 0].tolist()
+
+
+def draw_detections(image, corners, ids, rvecs, tvecs, detector):
+    '''
+    Description:    Draw marker outlines, ids, axes and center points of detected markers on a frame
+
+    Args:
+        image       (numpy.ndarray):    writeable frame to draw on (Ex: a copy of the frame used for detection)
+        corners     (numpy.ndarray):    (N,4,2) marker corners (ArucoDetector.last_corners)
+        ids         (numpy.ndarray):    (N,) marker ids (ArucoDetector.last_ids)
+        rvecs       (numpy.ndarray):    (N,3) rotation vectors (ArucoDetector.last_rvecs)
+        tvecs       (numpy.ndarray):    (N,3) translation vectors (ArucoDetector.last_tvecs)
+        detector    (ArucoDetector):    provides camera intrinsics and marker size for the axes
+    '''
+
+    if len(ids) == 0:
+        return
+    cv2.aruco.drawDetectedMarkers(image, tuple(corners[:, np.newaxis]), ids.reshape(-1, 1))
+    for rvec, tvec in zip(rvecs, tvecs):
+        cv2.aruco.drawAxis(image, detector.cam_mat, detector.dist_mat, rvec, tvec, detector.size_of_aruco_m)
+    for cX, cY in corners.mean(axis=1):
+        center_coords = (int(cX),int(cY))
+        cv2.circle(image,center_coords,10,(255,0,0),-1)
+        cv2.putText(image,"center",center_coords,cv2.FONT_HERSHEY_SIMPLEX,1,(255,255,255),2,cv2.LINE_AA)
+
+
+class MarkerTracker():
+    '''
+    ___CLASS___
+
+    Description:    Tracks detected markers across frames, keyed by marker ID.
+                    Center, distance and angle of each marker are smoothed with an exponential moving average, and the
+                    corners are predicted with a constant velocity model to restrict redetection to regions of interest.
+                    The full frame is scanned every full_scan_interval frames, and on the next frame whenever a track
+                    was not found in its region. Tracks not seen for timeout seconds are dropped.
+    '''
+
+    def __init__(self, alpha=0.5, full_scan_interval=10, timeout=1.0, roi_margin=0.5):
+        '''
+        Description:    Initialization of class MarkerTracker
+
+        Args:
+            alpha               (float):    weight of a new measurement in the moving average (1.0 disables filtering)
+            full_scan_interval  (int):      scan the full frame every K frames
+            timeout             (float):    seconds after which a track which is not seen anymore is dropped
+            roi_margin          (float):    margin added around the predicted marker box, relative to its size
+        '''
+
+        self.alpha = alpha
+        self.full_scan_interval = max(1, full_scan_interval)
+        self.timeout = timeout
+        self.roi_margin = roi_margin
+
+        self.tracks = {}                                                                # marker id -> filtered state
+        self.frame_count = 0
+        self.full_scan_pending = True
+
+
+    def plan_rois(self, frame_shape):
+        '''
+        Description:    Regions of interest to search in the next frame
+
+        Args:
+            frame_shape (tuple):    (height, width) of the frame
+
+        Returns:
+            rois        (list):     (x0, y0, x1, y1) region around the predicted position of each track,
+                                    None when the full frame has to be scanned
+        '''
+
+        self.frame_count += 1
+        if not self.tracks or self.full_scan_pending or self.frame_count % self.full_scan_interval == 0:
+            return None
+
+        height, width = frame_shape[:2]
+        rois = []
+        for track in self.tracks.values():
+            predicted = track['corners'] + track['velocity']
+            (x0, y0), (x1, y1) = predicted.min(axis=0), predicted.max(axis=0)
+            margin = self.roi_margin * max(x1 - x0, y1 - y0)
+            rois.append((int(max(0, x0 - margin)), int(max(0, y0 - margin)),
+                         int(min(width, x1 + margin + 1)), int(min(height, y1 + margin + 1))))
+        return rois
+
+
+    def update(self, detections, corners, now, full_scan):
+        '''
+        Description:    Update tracks with the detections of a frame
+
+        Args:
+            detections  (tuple):            five lists returned by ArucoDetector.detect
+            corners     (numpy.ndarray):    (N,4,2) corners of the detected markers (ArucoDetector.last_corners)
+            now         (float):            time of the frame in seconds
+            full_scan   (bool):             True if the full frame was scanned (plan_rois() returned None)
+
+        Returns:
+            detections  (tuple):            same five lists with filtered center, distance and angle
+        '''
+
+        center_aruco_list, distance_from_rgb_list, angle_aruco_list, width_aruco_list, ids = detections
+        alpha = self.alpha
+
+        for i, marker_id in enumerate(ids):
+            center = np.asarray(center_aruco_list[i], dtype=np.float64)
+            track = self.tracks.get(marker_id)
+            if track is None:
+                track = {'center': center, 'distance': distance_from_rgb_list[i], 'angle': angle_aruco_list[i],
+                         'corners': corners[i], 'velocity': np.zeros((1, 2), dtype=np.float32)}
+                self.tracks[marker_id] = track
+            else:
+                angle_error = math.remainder(angle_aruco_list[i] - track['angle'], 2 * math.pi)
+                track['center'] = alpha * center + (1.0 - alpha) * track['center']
+                track['distance'] = alpha * distance_from_rgb_list[i] + (1.0 - alpha) * track['distance']
+                track['angle'] = math.remainder(track['angle'] + alpha * angle_error, 2 * math.pi)
+                track['velocity'] = (corners[i] - track['corners']).mean(axis=0, keepdims=True)
+                track['corners'] = corners[i]
+            track['last_seen'] = now
+
+            center_aruco_list[i] = track['center'].tolist()
+            distance_from_rgb_list[i] = track['distance']
+            angle_aruco_list[i] = track['angle']
+
+        # a track searched in its region but not found there may have moved away, scan the full frame next time
+        seen = set(ids)
+        self.full_scan_pending = not full_scan and any(marker_id not in seen for marker_id in self.tracks)
+
+        for marker_id in [marker_id for marker_id, track in self.tracks.items() if now - track['last_seen'] > self.timeout]:
+            del self.tracks[marker_id]
+
+        return center_aruco_list, distance_from_rgb_list, angle_aruco_list, width_aruco_list, ids
+
+
+class PoseCache():
+    '''
+    ___CLASS___
+
+    Description:    Last published pose of each marker frame, to skip re-broadcasting transforms which did not change.
+                    A transform is published when its frame is new, when it moved more than the translation or rotation
+                    threshold since it was last published, or as a keepalive every keepalive seconds.
+                    Frames not seen for ttl seconds are evicted, and the least recently seen ones when over max_size.
+                    Times are taken from the transform stamps, so replays of the same input publish the same transforms.
+    '''
+
+    def __init__(self, translation_threshold=0.005, rotation_threshold=0.01, keepalive=1.0, ttl=5.0, max_size=64):
+        '''
+        Description:    Initialization of class PoseCache
+
+        Args:
+            translation_threshold   (float):    min translation since the last published pose to publish again (m)
+            rotation_threshold      (float):    min rotation since the last published pose to publish again (radians)
+            keepalive               (float):    republish unchanged poses after this many seconds, 0 to never republish them
+            ttl                     (float):    evict frames not seen for this many seconds
+            max_size                (int):      max number of cached frames
+        '''
+
+        self.translation_threshold = translation_threshold
+        self.rotation_threshold = rotation_threshold
+        self.keepalive = keepalive
+        self.ttl = ttl
+        self.max_size = max_size
+
+        self.entries = OrderedDict()                                                    # (frame_id, child_frame_id) -> entry, least recently seen first
+        self.suppressed = 0                                                             # transforms not published since unchanged
+        self.evicted = []                                                               # keys evicted by the last filter() call
+
+
+    def changed(self, entry, translation, rotation):
+        dx, dy, dz = (a - b for a, b in zip(translation, entry['translation']))
+        if math.sqrt(dx*dx + dy*dy + dz*dz) > self.translation_threshold:
+            return True
+        dot = abs(sum(a * b for a, b in zip(rotation, entry['rotation'])))
+        return 2.0 * math.acos(min(1.0, dot)) > self.rotation_threshold
+
+
+    def filter(self, transforms):
+        '''
+        Description:    Keep the transforms which have to be published and record them as the last published poses
+
+        Args:
+            transforms  (list):     TransformStamped of a frame
+
+        Returns:
+            transforms  (list):     transforms to publish
+        '''
+
+        if not transforms:
+            return transforms
+
+        self.evicted = []
+        now = max(t.header.stamp.sec + t.header.stamp.nanosec * 1e-9 for t in transforms)
+        while self.entries:
+            key, entry = next(iter(self.entries.items()))
+            if now - entry['seen'] <= self.ttl and len(self.entries) <= self.max_size:
+                break
+            del self.entries[key]
+            self.evicted.append(key)
+
+        published = []
+        for t in transforms:
+            key = (t.header.frame_id, t.child_frame_id)
+            translation = (t.transform.translation.x, t.transform.translation.y, t.transform.translation.z)
+            rotation = (t.transform.rotation.x, t.transform.rotation.y, t.transform.rotation.z, t.transform.rotation.w)
+
+            entry = self.entries.pop(key, None)
+            if (entry is None or self.changed(entry, translation, rotation)
+                    or (self.keepalive > 0 and now - entry['published'] >= self.keepalive)):
+                entry = {'translation': translation, 'rotation': rotation, 'published': now}
+                published.append(t)
+            else:
+                self.suppressed += 1
+            entry['seen'] = now
+            self.entries[key] = entry
+
+        while len(self.entries) > self.max_size:
+            self.evicted.append(self.entries.popitem(last=False)[0])
+
+        return published
+
+
+##################### FUNCTION DEFINITIONS #######################
+
+_default_detector = None                                                                # shared ArucoDetector used by the module level wrappers below
+
+
+def get_default_detector():
+    '''
+    Description:    Return the shared ArucoDetector used by detect_aruco and detect_aruco_batched, created on first use
+
+    Returns:
+        detector    (ArucoDetector):    shared detector with the default gazebo camera intrinsics
+    '''
+
+    global _default_detector
+    if _default_detector is None:
+        _default_detector = ArucoDetector()
+    return _default_detector
+
+
+def detect_aruco(image):
+    '''
+    Description:    Function to perform aruco detection and return each detail of aruco detected 
+                    such as marker ID, distance, angle, width, center point location, etc.
+                    Kept for backwards compatibility, see ArucoDetector.detect_loop
+
+    Args:
+        image                   (Image):    Input image frame received from respective camera topic
+
+    Returns:
+        center_aruco_list       (list):     Center points of all aruco markers detected
+        distance_from_rgb_list  (list):     Distance value of each aruco markers detected from RGB camera
+        angle_aruco_list        (list):     Angle of all pose estimated for aruco marker
+        width_aruco_list        (list):     Width of all detected aruco markers
+        ids                     (list):     List of all aruco marker IDs detected in a single frame 
+    '''
+
+    return get_default_detector().detect_loop(image)
+
+
+def detect_aruco_batched(image):
+    '''
+    Description:    Batched version of detect_aruco, see ArucoDetector.detect_batched
+
+    Args:
+        image                   (Image):    Input image frame received from respective camera topic
+
+    Returns:
+        Same five lists as detect_aruco (center_aruco_list, distance_from_rgb_list, angle_aruco_list, width_aruco_list, ids)
+    '''
+
+    return get_default_detector().detect_batched(image)
+
+
+def compare_detect_aruco_timing(image, repeats=1, detector=None):
+    '''
+    Description:    Time the per marker loop against the batched detection on the same frame.
+                    Each run works on its own copy of the frame as both paths draw on the image.
+
+    Args:
+        image       (Image):            Input image frame received from respective camera topic
+        repeats     (int):              number of runs of each path, the mean time is reported
+        detector    (ArucoDetector):    detector to time (shared default detector if None)
+
+    Returns:
+        loop_ms     (float):    mean time taken by the per marker loop in milliseconds
+        batched_ms  (float):    mean time taken by the batched path in milliseconds
+    '''
+
+    if detector is None:
+        detector = get_default_detector()
+
+    timings = []
+    for detect in (detector.detect_loop, detector.detect_batched):
+        frames = [image.copy() for _ in range(repeats)]
+        start = time.perf_counter()
+        for frame in frames:
+            detect(frame)
+        timings.append((time.perf_counter() - start) * 1000.0 / repeats)
+
+    return timings[0], timings[1]
+
+
+_pool_detector = None                                                                   # ArucoDetector of a detection pool worker process
+_pool_buffers = {}                                                                      # camera -> shared memory block attached by a detection pool worker process
+
+
+def _init_pool_worker(detector_kwargs):
+    '''
+    Description:    Initializer of the detection pool worker processes, builds the detector of the process once
+
+    Args:
+        detector_kwargs (dict):     keyword arguments of ArucoDetector
+    '''
+
+    global _pool_detector
+    _pool_detector = ArucoDetector(**detector_kwargs)
+
+
+def _attach_shared_memory(name):
+    '''
+    Description:    Attach a shared memory block created by the parent process without registering it with the
+                    resource tracker shared with the parent, which owns and unlinks the block (see DetectionPool)
+    '''
+
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)                       # python >= 3.13
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+def _pool_detect(camera, shm_name, shape, dtype, encoding, intrinsics):
+    '''
+    Description:    Detect arucos on a frame stored in shared memory (run in a detection pool worker process)
+
+    Args:
+        camera      (str):      camera the frame belongs to
+        shm_name    (str):      name of the shared memory block holding the frame (a new name when the camera's block was replaced)
+        shape       (tuple):    shape of the frame
+        dtype       (str):      numpy dtype of the frame
+        encoding    (str):      colour encoding of the frame (key of GRAY_CONVERSIONS)
+        intrinsics  (tuple):    (cam_mat, dist_mat, width, height) of the camera
+
+    Returns:
+        detections  (tuple):            five lists as returned by ArucoDetector.detect
+        corners     (numpy.ndarray):    (N,4,2) corners of the detected markers
+        found       (int):              markers found before the area threshold
+    '''
+
+    shm = _pool_buffers.get(camera)
+    if shm is None or shm.name != shm_name:
+        # the parent replaced the block of this camera (Ex: frame size change) and unlinked the old one
+        if shm is not None:
+            shm.close()
+        shm = _pool_buffers[camera] = _attach_shared_memory(shm_name)
+
+    frame = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    frame.flags.writeable = False
+
+    _pool_detector.set_intrinsics(*intrinsics)
+    _pool_detector.color_encoding = encoding
+    detections = _pool_detector.detect(frame)
+    del frame                                                                           # no export of shm.buf may outlive the call, or the block can't be closed
+
+    return detections, _pool_detector.last_corners, _pool_detector.last_found
+
+
+class DetectionPool():
+    '''
+    ___CLASS___
+
+    Description:    Process pool running aruco detection for several cameras in parallel (outside of the GIL).
+                    Each camera owns a shared memory block the latest frame is copied into, only the block name,
+                    frame shape and intrinsics are sent to the worker. A camera has at most one frame in flight,
+                    frames arriving meanwhile are dropped.
+    '''
+
+    def __init__(self, workers, detector_kwargs=None):
+        '''
+        Description:    Initialization of class DetectionPool
+
+        Args:
+            workers         (int):      number of worker processes
+            detector_kwargs (dict):     keyword arguments of the ArucoDetector of each worker
+        '''
+
+        # workers are spawned, not forked, as forking a process running rclpy / DDS threads is unsafe
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                            initializer=_init_pool_worker, initargs=(detector_kwargs or {},))
+        self.lock = threading.Lock()
+        self.buffers = {}                                                               # camera -> SharedMemory holding its latest frame
+        self.busy = set()                                                               # cameras with a frame in flight
+        self.frames_dropped = 0
+
+
+    def submit(self, camera, frame, encoding, intrinsics):
+        '''
+        Description:    Copy a frame into the shared memory block of its camera and queue its detection
+
+        Args:
+            camera      (str):              camera the frame belongs to
+            frame       (numpy.ndarray):    colour frame
+            encoding    (str):              colour encoding of the frame
+            intrinsics  (tuple):            (cam_mat, dist_mat, width, height) of the camera
+
+        Returns:
+            future      (Future):           result of _pool_detect(), None if the camera still has a frame in flight
+        '''
+
+        with self.lock:
+            if camera in self.busy:
+                self.frames_dropped += 1
+                return None
+            self.busy.add(camera)
+
+            shm = self.buffers.get(camera)
+            if shm is None or shm.size < frame.nbytes:
+                if shm is not None:
+                    shm.close()
+                    shm.unlink()
+                shm = shared_memory.SharedMemory(create=True, size=frame.nbytes)
+                self.buffers[camera] = shm
+
+        np.copyto(np.ndarray(frame.shape, dtype=frame.dtype, buffer=shm.buf), frame)
+        future = self.executor.submit(_pool_detect, camera, shm.name, frame.shape, frame.dtype.str, encoding, intrinsics)
+        future.add_done_callback(lambda _: self.release(camera))
+        return future
+
+
+    def release(self, camera):
+        '''
+        Description:    Mark the frame of a camera as done, so the next one can be submitted
+        '''
+
+        with self.lock:
+            self.busy.discard(camera)
+
+
+    def close(self):
+        '''
+        Description:    Stop the worker processes and free the shared memory blocks
+        '''
+
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        for shm in self.buffers.values():
+            shm.close()
+            shm.unlink()
+        self.buffers.clear()
+
+
+class CameraStream():
+    '''
+    ___CLASS___
+
+    Description:    One camera of the multi camera mode: topic namespace, tf frame, intrinsics and latest depth image
+    '''
+
+    def __init__(self, namespace, frame_id):
+        '''
+        Description:    Initialization of class CameraStream
+
+        Args:
+            namespace   (str):      topic namespace of the camera (Ex: /camera_left)
+            frame_id    (str):      tf frame of the camera (Ex: camera_left_link)
+        '''
+
+        self.namespace = namespace
+        self.frame_id = frame_id
+        self.cam_frame_suffix = '_' + namespace.strip('/').replace('/', '_')             # 2029_cam_<id>_<camera>, so each marker frame has a single parent camera
+        self.detector = ArucoDetector()                                                 # only used for its intrinsics, detection runs in the pool
+        self.depth_image = None
+
+
+##################### CLASS DEFINITION #######################
+
+class Histogram():
+    '''
+    ___CLASS___
+
+    Description:    Cumulative histogram with fixed bucket bounds (Prometheus style), cheap enough to observe on every frame
+    '''
+
+    def __init__(self, buckets):
+        '''
+        Description:    Initialization of class Histogram
+
+        Args:
+            buckets     (tuple):    sorted upper bounds of the buckets (an implicit +Inf bucket is added)
+        '''
+
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+    def quantile(self, q):
+        '''
+        Description:    Upper bound of the bucket holding the q quantile (inf if beyond the last bucket, 0 if empty)
+        '''
+
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return math.inf
+
+
+class Metrics():
+    '''
+    ___CLASS___
+
+    Description:    Hot path instrumentation of the node: counters and latency histograms.
+                    Exported as Prometheus text (see MetricsServer) and as diagnostic key values.
+    '''
+
+    # seconds
+    BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+    def __init__(self, prefix='aruco'):
+        '''
+        Description:    Initialization of class Metrics
+
+        Args:
+            prefix      (str):      prefix of all metric names
+        '''
+
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.counters = {}                                                              # name -> value
+        self.histograms = {}                                                            # (name, stage) -> Histogram
+
+
+    def inc(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+
+    def observe(self, name, value, stage=None):
+        with self.lock:
+            histogram = self.histograms.get((name, stage))
+            if histogram is None:
+                histogram = self.histograms[(name, stage)] = Histogram(self.BUCKETS)
+            histogram.observe(value)
+
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        '''
+        Description:    Context manager timing a pipeline stage into the stage_seconds histogram (used as ArucoDetector.stage_timer)
+        '''
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('stage_seconds', time.perf_counter() - start, name)
+
+
+    def prometheus_text(self):
+        '''
+        Description:    All metrics in the Prometheus text exposition format
+
+        Returns:
+            text        (str):      metrics, one sample per line
+        '''
+
+        lines = []
+        with self.lock:
+            for name, value in sorted(self.counters.items()):
+                lines.append(f'# TYPE {self.prefix}_{name} counter')
+                lines.append(f'{self.prefix}_{name} {value}')
+
+            typed = set()
+            for (name, stage), histogram in sorted(self.histograms.items(), key=lambda item: (item[0][0], item[0][1] or '')):
+                metric = f'{self.prefix}_{name}'
+                if metric not in typed:
+                    lines.append(f'# TYPE {metric} histogram')
+                    typed.add(metric)
+                labels = f'stage="{stage}",' if stage else ''
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + (math.inf,), histogram.counts):
+                    cumulative += count
+                    le = '+Inf' if bound == math.inf else repr(bound)
+                    lines.append(f'{metric}_bucket{{{labels}le="{le}"}} {cumulative}')
+                labels = '{' + labels.rstrip(',') + '}' if labels else ''
+                lines.append(f'{metric}_sum{labels} {histogram.sum}')
+                lines.append(f'{metric}_count{labels} {histogram.count}')
+
+        return '\n'.join(lines) + '\n'
+
+
+    def key_values(self):
+        '''
+        Description:    Counters and histogram summaries (count, mean, p50, p99) as (key, value) strings
+
+        Returns:
+            key_values  (list):     (key, value) pairs
+        '''
+
+        key_values = []
+        with self.lock:
+            for name, value in sorted(self.counters.items()):
+                key_values.append((name, str(value)))
+            for (name, stage), histogram in sorted(self.histograms.items(), key=lambda item: (item[0][0], item[0][1] or '')):
+                key = f'{name}[{stage}]' if stage else name
+                mean = histogram.sum / histogram.count if histogram.count else 0.0
+                key_values.append((key, f'count={histogram.count} mean={mean:.6f} p50<={histogram.quantile(0.5)} p99<={histogram.quantile(0.99)}'))
+
+        return key_values
+
+
+class MetricsServer():
+    '''
+    ___CLASS___
+
+    Description:    Local HTTP endpoint serving Metrics in the Prometheus text format on GET /metrics, from a daemon thread
+    '''
+
+    def __init__(self, metrics, port, address='127.0.0.1'):
+        '''
+        Description:    Initialization of class MetricsServer (starts serving right away)
+
+        Args:
+            metrics     (Metrics):  metrics to serve
+            port        (int):      TCP port
+            address     (str):      address to bind to
+        '''
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                if handler.path.split('?')[0] not in ('/', '/metrics'):
+                    handler.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode()
+                handler.send_response(200)
+                handler.send_header('Content-Type', 'text/plain; version=0.0.4')
+                handler.send_header('Content-Length', str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((address, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name='aruco_metrics_http', daemon=True)
+        self.thread.start()
+
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class LatestFrameQueue():
+    '''
+    ___CLASS___
+
+    Description:    Bounded single slot queue holding only the latest frame received.
+                    A new frame replaces a frame which was not picked up yet (counted as dropped),
+                    so the consumer never works on stale or already processed frames.
+    '''
+
+    def __init__(self):
+        '''
+        Description:    Initialization of class LatestFrameQueue
+        '''
+
+        self._cond = threading.Condition()
+        self._frame = None
+        self._closed = False
+
+        self.frames_received = 0                                                        # frames handed over by the image callback
+        self.frames_processed = 0                                                       # frames taken from the queue and processed
+        self.frames_dropped = 0                                                         # frames replaced before being processed
+
+
+    def put(self, frame):
+        '''
+        Description:    Hand over a new frame, replacing the pending one if it was not processed yet
+
+        Args:
+            frame       (object):   frame to be processed
+        '''
+
+        with self._cond:
+            if self._frame is not None:
+                self.frames_dropped += 1
+            self._frame = frame
+            self.frames_received += 1
+            self._cond.notify()
+
+
+    def get(self, timeout=None):
+        '''
+        Description:    Take the pending frame, waiting up to timeout seconds for one to arrive
+
+        Args:
+            timeout     (float):    seconds to wait, 0 to return immediately, None to wait until a frame or close()
+
+        Returns:
+            frame       (object):   latest frame, None if no fresh frame arrived (or the queue was closed)
+        '''
+
+        with self._cond:
+            if self._frame is None and not self._closed and timeout != 0:
+                self._cond.wait(timeout)
+            frame, self._frame = self._frame, None
+            return frame
+
+
+    def task_done(self):
+        '''
+        Description:    Mark a frame taken with get() as processed
+        '''
+
+        with self._cond:
+            self.frames_processed += 1
+
+
+    def close(self):
+        '''
+        Description:    Wake up any consumer waiting in get()
+        '''
+
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+    def stats(self):
+        '''
+        Description:    Snapshot of frame counters
+
+        Returns:
+            stats       (dict):     frames received, processed and dropped
+        '''
+
+        with self._cond:
+            return {'received': self.frames_received, 'processed': self.frames_processed, 'dropped': self.frames_dropped}
+
+
+class VisualizationSink():
+    '''
+    ___CLASS___
+
+    Description:    Renders annotated frames on its own thread, at most max_rate times per second, either in a
+                    cv2 window or as a compressed debug image topic. Annotations are drawn on a copy, the frame
+                    handed over is never modified. Frames arriving faster than the rate are skipped without copying.
+    '''
+
+    def __init__(self, mode='window', max_rate=10.0, publisher=None, jpeg_quality=80):
+        '''
+        Description:    Initialization of class VisualizationSink (starts the render thread)
+
+        Args:
+            mode        (str):          'window' to show frames with cv2.imshow, 'topic' to publish them
+            max_rate    (float):        max rendered frames per second
+            publisher   (Publisher):    sensor_msgs/CompressedImage publisher of 'topic' mode
+            jpeg_quality(int):          JPEG quality of published frames
+        '''
+
+        self.mode = mode
+        self.period = 1.0 / max_rate
+        self.publisher = publisher
+        self.encode_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        self.next_render = 0.0
+        self.frames_skipped = 0                                                         # frames not rendered because of the rate cap
+
+        self.queue = LatestFrameQueue()
+        self.running = True
+        self.thread = threading.Thread(target=self.render_loop, name='aruco_visualization', daemon=True)
+        self.thread.start()
+
+
+    def submit(self, image, annotations, encoding, header=None):
+        '''
+        Description:    Hand over a frame to be rendered, unless the previous one was rendered less than a period ago
 
-    #	->  Convert input BGR image to GRAYSCALE for aruco detection
-    gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        Args:
+            image       (numpy.ndarray):    frame the markers were detected on (not modified)
+            annotations (tuple):            (corners, ids, rvecs, tvecs, detector) as taken by draw_detections()
+            encoding    (str):              encoding of the frame (Ex: 'rgb8')
+            header      (Header):           header of the colour image message, reused for the debug image
+        '''
 
-    #   ->  Use these aruco parameters-
-    #       ->  Dictionary: 4x4_50 (4x4 only until 50 aruco IDs)
-    aruco_dict = cv2.aruco.getPredefinedDictionary(cv2.aruco.DICT_4X4_50)
-    params = cv2.aruco.DetectorParameters_create()
+        now = time.monotonic()
+        if now < self.next_render:
+            self.frames_skipped += 1
+            return
+        self.next_render = now + self.period
+        self.queue.put((image, annotations, encoding, header))
 
-    #   ->  Detect aruco marker in the image and store 'corners' and 'ids'
-    #       ->  HINT: Handle cases for empty markers detection. 
-    corners,ids_list,empty_markers = cv2.aruco.detectMarkers(gray,aruco_dict,parameters=params)
 
-    #   ->  Draw detected marker on the image frame which will be shown later
-    cv2.aruco.drawDetectedMarkers(image, corners, ids_list)
+    def render_loop(self):
+        '''
+        Description:    Thread function drawing and showing / publishing the latest submitted frame
+        '''
 
-    #   ->  Loop over each marker ID detected in frame and calculate area using function defined above (calculate_rectangle_area(coordinates))
-    if ids_list is not None:
-        for i in range(len(ids_list)):
-            area,width = calculate_rectangle_area(corners[i][0])
-            #   ->  Remove tags which are far away from arm's reach positon based on some threshold defined
-            if(area<aruco_area_threshold):
+        while self.running:
+            item = self.queue.get(timeout=0.5)
+            if item is None:
                 continue
+            image, annotations, encoding, header = item
+            canvas = image.copy()
+            draw_detections(canvas, *annotations)
+            if self.mode == 'window':
+                cv2.imshow("Color image", canvas)
+                cv2.waitKey(1)
             else:
-                #->  Calculate center points aruco list using math and distance from RGB camera using pose estimation of aruco marker
-                #->  HINT: You may use numpy for center points and 'estimatePoseSingleMarkers' from cv2 aruco library for pose estimation
-
-                cx = np.mean(corners[i][0][:,0])
-                cy = np.mean(corners[i][0][:,1])
-                center_aruco_list.append([cx,cy])
-                rvec, tvec, _ = cv2.aruco.estimatePoseSingleMarkers(corners[i], size_of_aruco_m, cam_mat, dist_mat)
-                #print("center:",center_aruco_list[i])
-                # distance_from_rgb = np.linalg.norm(tvec[0][0])
-                distance_from_rgb = np.sqrt(tvec[0][0][0]**2 + tvec[0][0][1]**2 + tvec[0][0][2]**2)
-                distance_from_rgb_list.append(distance_from_rgb)
-
-                # Calculate the angle of the ArUco marker
-                
-                # angle_aruco = np.arctan2(np.linalg.norm([tvec[0][0][0],tvec[0][0][1]]), tvec[0][0][2])
-                angle_aruco = rvec[0][0][2] # yaw
-                angle_aruco_list.append(angle_aruco)
-                '''
-                rotation_matrix, _ = cv2.Rodrigues(rvec)
-                angles_rad = cv2.RQDecomp3x3(rotation_matrix)[0]
-                angles_deg = list(np.degrees(angles_rad))
-                angle_aruco_list.append(angles_deg)
-                '''
-
-                # Append marker width and ID
-                width_aruco_list.append(width)
-                ids.append(ids_list[i][0])
-
-                #->  Draw frame axes from coordinates received using pose estimation
-                #->  HINT: You may use 'cv2.drawFrameAxes'
-                cv2.aruco.drawAxis(image, cam_mat, dist_mat, rvec, tvec, size_of_aruco_m)
-    else:
-        print("No ArUco marker detected")
-    ############################################
+                self.publish(canvas, encoding, header)
+            self.queue.task_done()
 
 
-    return center_aruco_list, distance_from_rgb_list, angle_aruco_list, width_aruco_list, ids
+    def publish(self, canvas, encoding, header):
+        if encoding in ('rgb8', 'rgba8'):
+            canvas = cv2.cvtColor(canvas, cv2.COLOR_RGB2BGR if encoding == 'rgb8' else cv2.COLOR_RGBA2BGR)
+        ok, buffer = cv2.imencode('.jpg', canvas, self.encode_params)
+        if not ok:
+            return
+        msg = CompressedImage()
+        if header is not None:
+            msg.header = header
+        msg.format = 'jpeg'
+        msg.data = buffer.tobytes()
+        self.publisher.publish(msg)
 
 
-##################### CLASS DEFINITION #######################
+    def close(self):
+        self.running = False
+        self.queue.close()
+        self.thread.join(timeout=1.0)
+
+
+LOG_LEVEL_ALIASES = {'WARNING': 'WARN', 'CRITICAL': 'FATAL'}                          # python logging spellings of the rclpy severities
+
 
 class aruco_tf(Node):
     '''
@@ -200,20 +1758,80 @@ class aruco_tf(Node):
     Description:    Class which servers purpose to define process for detecting aruco marker and publishing tf on pose estimated.
     '''
 
-    def __init__(self):
+    def __init__(self, **kwargs):
         '''
         Description:    Initialization of class aruco_tf
                         All classes have a function called __init__(), which is always executed when the class is being initiated.
                         The __init__() function is called automatically every time the class is being used to create a new object.
                         You can find more on this topic here -> https://www.w3schools.com/python/python_classes.asp
+
+        Args:
+            kwargs      (dict):     extra keyword arguments for rclpy Node (Ex: parameter_overrides)
         '''
 
-        super().__init__('aruco_tf_publisher')                                          # registering node
+        super().__init__('aruco_tf_publisher', **kwargs)                                # registering node
+
+        ############ Node PARAMETERS ############
+
+        self.declare_parameter('batched_detection', True)                               # detect all markers of a frame in one vectorized pass (detect_aruco_batched)
+        self.declare_parameter('detector_profile', 'default')                           # 'default' (OpenCV defaults), 'fast', 'balanced' or 'accurate' (see DETECTOR_PROFILES)
+        self.declare_parameter('detector_params', '')                                   # JSON object of cv2.aruco.DetectorParameters applied over the profile (Ex: as printed by tools/autotune.py)
+        self.declare_parameter('aruco_dictionary', 'DICT_4X4_50')                       # predefined cv2.aruco dictionary of the markers
+        self.declare_parameter('marker_size', 0.15)                                     # side length of the markers (m)
+        self.declare_parameter('aruco_area_threshold', 1500.0)                          # markers with a smaller area (pixels) are ignored, Ex: boxes far away from arm's reach
+        self.declare_parameter('compare_detection_timing', False)                       # log per frame timing of the batched path against the per marker loop
+        self.declare_parameter('camera_info_yaml', '')                                  # calibration yaml used as intrinsics until /camera/camera_info is received
+        self.declare_parameter('processing_mode', 'timer')                              # 'timer': process latest frame every image_processing_rate, 'event': process each fresh frame on a worker thread
+        self.declare_parameter('executor', 'single')                                    # 'single': rclpy.spin, 'multi': MultiThreadedExecutor (see main())
+        self.declare_parameter('executor_threads', 4)                                   # number of threads of the MultiThreadedExecutor
+        self.declare_parameter('zero_copy_ingest', False)                               # wrap image messages as read-only numpy views instead of CvBridge copies
+        self.declare_parameter('depth_fusion', 'off')                                   # 'off', or which source wins between PnP and aligned depth: 'pnp', 'depth', 'consistent' (see fuse_distances())
+        self.declare_parameter('depth_patch_size', 5)                                   # side of the depth patch sampled around each marker center (pixels)
+        self.declare_parameter('depth_pnp_tolerance', 0.05)                             # max difference between depth and PnP distance to be consistent (m)
+        self.declare_parameter('local_tf_composition', False)                           # compose base_link poses locally from one base_link -> camera_link lookup per frame
+        self.declare_parameter('batch_tf_publish', False)                               # send all transforms of a frame in one TFMessage stamped with the image header stamp
+        self.declare_parameter('tracking', False)                                       # track markers across frames (filtered poses, ROI restricted redetection)
+        self.declare_parameter('tracker_alpha', 0.5)                                    # weight of a new measurement in the moving average of a track
+        self.declare_parameter('tracker_full_scan_interval', 10)                        # scan the full frame every K frames while tracking
+        self.declare_parameter('tracker_timeout', 1.0)                                  # drop a track not seen for this many seconds
+        self.declare_parameter('tracker_roi_margin', 0.5)                               # margin around the predicted marker box, relative to its size
+        self.declare_parameter('camera_namespaces', '')                                 # comma separated camera namespaces for multi camera mode (Ex: '/camera_left,/camera_right'), '' for the single /camera
+        self.declare_parameter('camera_frame_ids', '')                                  # comma separated tf frame of each camera namespace
+        self.declare_parameter('camera_merge_window', 0.5)                              # a marker seen by several cameras gets its 2029_base_<id> from the nearest one seen within this many seconds
+        self.declare_parameter('detection_workers', 0)                                  # detection processes of multi camera mode, 0 for one per camera (up to the number of cores)
+        self.declare_parameter('pyramid_scale', 1.0)                                    # detect on a frame downscaled by this factor (Ex: 0.5) and refine corners at full resolution, 1.0 to disable
+        self.declare_parameter('refine_window', 5)                                      # half size of the full resolution corner refinement window (pixels)
+        self.declare_parameter('log_level', 'info')                                     # 'debug', 'info', 'warn', 'error' or 'fatal' logger level of the node, per frame messages (marker positions, lookups) are logged at 'debug'
+        self.declare_parameter('metrics_port', 0)                                       # local HTTP port serving Prometheus text metrics on /metrics, 0 to disable
+        self.declare_parameter('diagnostics_period', 1.0)                               # period of metrics published on /diagnostics (seconds), 0 to disable
+        self.declare_parameter('visualization', 'window')                               # 'window': cv2 window, 'topic': /aruco/debug_image/compressed, 'off': headless, nothing is drawn
+        self.declare_parameter('visualization_rate', 10.0)                              # max annotated frames rendered per second
+        self.declare_parameter('pose_cache', False)                                     # skip re-broadcasting marker transforms which did not change (see PoseCache)
+        self.declare_parameter('pose_cache_translation', 0.005)                         # translation below which a pose is unchanged (m)
+        self.declare_parameter('pose_cache_rotation', 0.01)                             # rotation below which a pose is unchanged (radians)
+        self.declare_parameter('pose_cache_keepalive', 1.0)                             # republish unchanged poses on /tf every this many seconds (keep below the 10 s tf2 buffer), 0 to never
+        self.declare_parameter('pose_cache_static', False)                              # publish poses on latched /tf_static instead of /tf, only when they change (never expire in listeners)
+        self.declare_parameter('pose_cache_ttl', 5.0)                                   # forget markers not seen for this many seconds
+        self.declare_parameter('pose_cache_size', 64)                                   # max number of cached marker frames
+        self.declare_parameter('tf_output_file', '')                                    # also write every published transform as a JSON line to this file (Ex: for replay regression tests)
+
+        ############ Callback GROUPS ############
+
+        # Only matter with the MultiThreadedExecutor, so image decoding never waits for detection.
+        # Each stream has its own mutually exclusive group: colour and depth decoding may run in parallel, but the
+        # frames of one stream are converted one at a time and in order, so an older frame never replaces a newer one.
+        # Detection never overlaps with itself.
+        # The tf2 TransformListener subscribes /tf and /tf_static in its own ReentrantCallbackGroup (TF I/O).
+        self.color_cb_group = MutuallyExclusiveCallbackGroup()
+        self.depth_cb_group = MutuallyExclusiveCallbackGroup()
+        self.info_cb_group = MutuallyExclusiveCallbackGroup()
+        self.detection_cb_group = MutuallyExclusiveCallbackGroup()
 
         ############ Topic SUBSCRIPTIONS ############
 
-        self.color_cam_sub = self.create_subscription(Image, '/camera/color/image_raw', self.colorimagecb, 10)
-        self.depth_cam_sub = self.create_subscription(Image, '/camera/aligned_depth_to_color/image_raw', self.depthimagecb, 10)
+        self.color_cam_sub = self.create_subscription(Image, '/camera/color/image_raw', self.colorimagecb, 10, callback_group=self.color_cb_group)
+        self.depth_cam_sub = self.create_subscription(Image, '/camera/aligned_depth_to_color/image_raw', self.depthimagecb, 10, callback_group=self.depth_cb_group)
+        self.cam_info_sub = self.create_subscription(CameraInfo, '/camera/camera_info', self.camerainfocb, 10, callback_group=self.info_cb_group)
 
         ############ Constructor VARIABLES/OBJECTS ############
 
@@ -222,10 +1840,288 @@ class aruco_tf(Node):
         self.tf_buffer = tf2_ros.buffer.Buffer()                                        # buffer time used for listening transforms
         self.listener = tf2_ros.TransformListener(self.tf_buffer, self)
         self.br = tf2_ros.TransformBroadcaster(self)                                    # object as transform broadcaster to send transform wrt some frame_id
-        self.timer = self.create_timer(image_processing_rate, self.process_image)       # creating a timer based function which gets called on every 0.2 seconds (as defined by 'image_processing_rate' variable)
+        self.static_br = None                                                           # /tf_static broadcaster of pose_cache_static
+        self.static_transforms = {}                                                     # child_frame_id -> latest transform sent on /tf_static
         
+        self.image_lock = threading.Lock()                                              # guards cv_image / depth_image, written and read from several executor threads
         self.cv_image = None                                                            # colour raw image variable (from colorimagecb())
         self.depth_image = None                                                         # depth image variable (from depthimagecb())
+        self.frame_queue = LatestFrameQueue()                                           # latest (colour frame, header) not processed yet (from colorimagecb())
+        self.callback_latency = {'color': deque(maxlen=1000), 'depth': deque(maxlen=1000)}  # seconds from image header stamp to callback, per stream
+
+        log_level = self.get_parameter('log_level').value.upper()
+        log_level = LOG_LEVEL_ALIASES.get(log_level, log_level)
+        if log_level not in ('DEBUG', 'INFO', 'WARN', 'ERROR', 'FATAL'):
+            raise ValueError(f"Unknown log_level {self.get_parameter('log_level').value}, expected debug, info, warn, error or fatal")
+        self.get_logger().set_level(LoggingSeverity[log_level])
+        self.log_debug = log_level == 'DEBUG'                                           # skip building per frame log messages unless they are shown
+
+        # hot path instrumentation (stage timing, marker / lookup counters, frame age)
+        self.metrics = Metrics()
+        self.metrics_server = None
+        metrics_port = self.get_parameter('metrics_port').value
+        if metrics_port:
+            self.metrics_server = MetricsServer(self.metrics, metrics_port)
+        diagnostics_period = self.get_parameter('diagnostics_period').value
+        if diagnostics_period > 0:
+            self.diagnostics_pub = self.create_publisher(DiagnosticArray, '/diagnostics', 10)
+            self.diagnostics_timer = self.create_timer(diagnostics_period, self.publish_diagnostics)
+
+        self.pose_cache = None
+        if self.get_parameter('pose_cache').value:
+            static = self.get_parameter('pose_cache_static').value
+            self.pose_cache = PoseCache(translation_threshold=self.get_parameter('pose_cache_translation').value,
+                                        rotation_threshold=self.get_parameter('pose_cache_rotation').value,
+                                        keepalive=0.0 if static else self.get_parameter('pose_cache_keepalive').value,
+                                        ttl=self.get_parameter('pose_cache_ttl').value,
+                                        max_size=self.get_parameter('pose_cache_size').value)
+            if static:
+                self.static_br = tf2_ros.StaticTransformBroadcaster(self)
+
+        self.tf_output = None
+        tf_output_file = self.get_parameter('tf_output_file').value
+        if tf_output_file:
+            self.tf_output = open(tf_output_file, 'w')
+
+        self.compare_detection_timing = self.get_parameter('compare_detection_timing').value
+        self.zero_copy_ingest = self.get_parameter('zero_copy_ingest').value
+        self.depth_fusion = self.get_parameter('depth_fusion').value
+        if self.depth_fusion != 'off' and self.depth_fusion not in DEPTH_FUSION_MODES:
+            raise ValueError(f"Unknown depth_fusion {self.depth_fusion}, expected 'off' or one of {DEPTH_FUSION_MODES}")
+        self.depth_patch_size = self.get_parameter('depth_patch_size').value
+        self.depth_pnp_tolerance = self.get_parameter('depth_pnp_tolerance').value
+        self.local_tf_composition = self.get_parameter('local_tf_composition').value
+        self.batch_tf_publish = self.get_parameter('batch_tf_publish').value
+
+        self.tracker = None
+        if self.get_parameter('tracking').value:
+            self.tracker = MarkerTracker(alpha=self.get_parameter('tracker_alpha').value,
+                                         full_scan_interval=self.get_parameter('tracker_full_scan_interval').value,
+                                         timeout=self.get_parameter('tracker_timeout').value,
+                                         roi_margin=self.get_parameter('tracker_roi_margin').value)
+
+        # detector owning aruco dictionary, detector parameters and camera intrinsics (built once, not on every frame)
+        self.detector = ArucoDetector(aruco_area_threshold=self.get_parameter('aruco_area_threshold').value,
+                                      size_of_aruco_m=self.get_parameter('marker_size').value,
+                                      batched=self.get_parameter('batched_detection').value,
+                                      pyramid_scale=self.get_parameter('pyramid_scale').value,
+                                      refine_window=self.get_parameter('refine_window').value,
+                                      dictionary=self.get_parameter('aruco_dictionary').value,
+                                      profile=self.get_parameter('detector_profile').value,
+                                      detector_params=json.loads(self.get_parameter('detector_params').value or '{}'))
+        self.detector.stage_timer = self.metrics
+        self.detector.logger = self.get_logger()
+        self.detector.draw = False                                                      # frames used for detection are never drawn on, see VisualizationSink
+
+        self.visualizer = None
+        visualization = self.get_parameter('visualization').value
+        if visualization not in ('window', 'topic', 'off'):
+            raise ValueError(f"Unknown visualization {visualization}, expected 'window', 'topic' or 'off'")
+        if visualization != 'off':
+            debug_image_pub = None
+            if visualization == 'topic':
+                debug_image_pub = self.create_publisher(CompressedImage, '/aruco/debug_image/compressed', 1)
+            self.visualizer = VisualizationSink(visualization, self.get_parameter('visualization_rate').value, debug_image_pub)
+        camera_info_yaml = self.get_parameter('camera_info_yaml').value
+        if camera_info_yaml:
+            try:
+                self.detector.load_intrinsics_yaml(camera_info_yaml)
+            except (OSError, KeyError, ValueError, yaml.YAMLError) as e:
+                self.get_logger().warn(f'Could not load camera intrinsics from {camera_info_yaml}: {e}')
+
+        self.cameras = []
+        self.detection_pool = None
+        self.camera_merge_window = self.get_parameter('camera_merge_window').value
+        self.marker_owners = {}                                                         # marker id -> (camera, distance, time) publishing its 2029_base_<id> in multi camera mode
+        self.pool_results = queue.Queue()                                               # (camera, header, color_shape, future) of multi camera mode
+        # mode parameters are checked before the detection pool of multi camera mode is started
+        self.processing_mode = self.get_parameter('processing_mode').value
+        if self.processing_mode not in ('timer', 'event'):
+            raise ValueError(f"Unknown processing_mode {self.processing_mode}, expected 'timer' or 'event'")
+        if self.get_parameter('executor').value not in ('single', 'multi'):
+            raise ValueError(f"Unknown executor {self.get_parameter('executor').value}, expected 'single' or 'multi'")
+        if self.get_parameter('executor_threads').value < 1:
+            raise ValueError(f"executor_threads must be at least 1, got {self.get_parameter('executor_threads').value}")
+        namespaces = [ns.strip().rstrip('/') for ns in self.get_parameter('camera_namespaces').value.split(',') if ns.strip()]
+        if namespaces:
+            self.start_multi_camera(namespaces, [f.strip() for f in self.get_parameter('camera_frame_ids').value.split(',')])
+
+        self.frame_worker = None
+        self.frame_worker_running = self.processing_mode == 'event' or bool(self.cameras)
+        if self.cameras:
+            # results of the detection pool are merged and published by a worker thread
+            self.frame_worker = threading.Thread(target=self.pool_result_loop, name='aruco_pool_results', daemon=True)
+            self.frame_worker.start()
+        elif self.processing_mode == 'event':
+            # dedicated worker processing every fresh frame as soon as it arrives, stale frames are dropped by the queue
+            self.frame_worker = threading.Thread(target=self.frame_worker_loop, name='aruco_frame_worker', daemon=True)
+            self.frame_worker.start()
+        else:
+            self.timer = self.create_timer(image_processing_rate, self.process_image,   # creating a timer based function which gets called on every 0.2 seconds (as defined by 'image_processing_rate' variable)
+                                           callback_group=self.detection_cb_group)
+
+
+    def start_multi_camera(self, namespaces, frame_ids):
+        '''
+        Description:    Subscribe the topics of every camera namespace and start the detection process pool.
+                        The single /camera subscriptions stay in place but are not processed.
+
+        Args:
+            namespaces  (list):     topic namespace of each camera
+            frame_ids   (list):     tf frame of each camera (defaults to <namespace>_link)
+        '''
+
+        for i, namespace in enumerate(namespaces):
+            frame_id = frame_ids[i] if i < len(frame_ids) and frame_ids[i] else namespace.strip('/') + '_link'
+            camera = CameraStream(namespace, frame_id)
+            self.cameras.append(camera)
+
+            # one mutually exclusive group per stream, as for the single camera subscriptions
+            self.create_subscription(Image, namespace + '/color/image_raw', lambda data, c=camera: self.multicolorimagecb(c, data), 10,
+                                     callback_group=MutuallyExclusiveCallbackGroup())
+            self.create_subscription(Image, namespace + '/aligned_depth_to_color/image_raw', lambda data, c=camera: self.multidepthimagecb(c, data), 10,
+                                     callback_group=MutuallyExclusiveCallbackGroup())
+            self.create_subscription(CameraInfo, namespace + '/camera_info', lambda data, c=camera: self.multicamerainfocb(c, data), 10,
+                                     callback_group=MutuallyExclusiveCallbackGroup())
+
+        workers = self.get_parameter('detection_workers').value or min(len(self.cameras), multiprocessing.cpu_count())
+        self.detection_pool = DetectionPool(workers, {'aruco_area_threshold': self.detector.aruco_area_threshold,
+                                                      'size_of_aruco_m': self.detector.size_of_aruco_m,
+                                                      'batched': self.detector.batched,
+                                                      'pyramid_scale': self.detector.pyramid_scale,
+                                                      'refine_window': self.detector.refine_window,
+                                                      'dictionary': self.detector.dictionary,
+                                                      'profile': self.detector.profile,
+                                                      'detector_params': self.detector.detector_params})
+        self.get_logger().info(f'Multi camera mode: {[c.namespace for c in self.cameras]}, {workers} detection processes')
+
+
+    def multicolorimagecb(self, camera, data):
+        '''
+        Description:    Callback function for the colour topic of a camera in multi camera mode, hands the frame to the detection pool
+
+        Args:
+            camera      (CameraStream):     camera the frame belongs to
+            data        (Image):            Input coloured raw image frame
+        '''
+
+        try:
+            frame = self.image_to_array(data)
+        except (CvBridgeError, ValueError) as e:
+            self.get_logger().error(f'Cannot convert colour image of {camera.namespace}: {e}', throttle_duration_sec=1.0)
+            return
+
+        detector = camera.detector
+        with detector.lock:
+            intrinsics = (detector.cam_mat, detector.dist_mat, detector.sizeCamX, detector.sizeCamY)
+        future = self.detection_pool.submit(camera.namespace, frame, data.encoding if data.encoding in GRAY_CONVERSIONS else 'rgb8', intrinsics)
+        if future is not None:
+            future.add_done_callback(lambda f: self.pool_results.put((camera, data.header, frame.shape[:2], f)))
+
+
+    def multidepthimagecb(self, camera, data):
+        '''
+        Description:    Callback function for the aligned depth topic of a camera in multi camera mode
+
+        Args:
+            camera      (CameraStream):     camera the frame belongs to
+            data        (Image):            Input depth image frame
+        '''
+
+        try:
+            depth_image = self.image_to_array(data)
+        except (CvBridgeError, ValueError) as e:
+            self.get_logger().error(f'Cannot convert depth image of {camera.namespace}: {e}', throttle_duration_sec=1.0)
+            return
+
+        with self.image_lock:
+            camera.depth_image = depth_image
+
+
+    def pool_result_loop(self):
+        '''
+        Description:    Worker thread of multi camera mode, publishes tf of each detection pool result
+
+        Args:
+        Returns:
+        '''
+
+        while rclpy.ok() and self.frame_worker_running:
+            try:
+                camera, header, color_shape, future = self.pool_results.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if future.cancelled() or future.exception() is not None:
+                continue
+            detections, _, found = future.result()
+            self.observe_frame_age(header)
+            self.metrics.inc('markers_detected_total', found)
+            self.metrics.inc('markers_filtered_total', max(0, found - len(detections[4])))
+            self.publish_detections(detections, header, color_shape=color_shape, camera=camera)
+
+
+    def claim_markers(self, camera, ids, distances):
+        '''
+        Description:    Merge the detections of all cameras per marker id: a camera only publishes 2029_base_<id> of a marker
+                        if it is the nearest camera which saw it within camera_merge_window seconds, so the base frame
+                        doesn't flip between the estimates of several cameras.
+
+        Args:
+            camera      (CameraStream):     camera of the detections
+            ids         (list):             detected marker ids
+            distances   (list):             distance of each marker from the camera (m)
+
+        Returns:
+            owned       (list):             True for each marker whose base frame this camera publishes
+        '''
+
+        now = time.monotonic()
+        owned = []
+        for marker_id, distance in zip(ids, distances):
+            owner = self.marker_owners.get(marker_id)
+            if (owner is None or owner[0] is camera or distance <= owner[1]
+                    or now - owner[2] > self.camera_merge_window):
+                self.marker_owners[marker_id] = (camera, distance, now)
+                owned.append(True)
+            else:
+                owned.append(False)
+        return owned
+
+
+    def camerainfocb(self, data):
+        '''
+        Description:    Callback function for camera info topic.
+                        Intrinsics of the detector are only refreshed when the camera info changes.
+
+        Args:
+            data (CameraInfo):    camera info received from camera info topic
+
+        Returns:
+        '''
+
+        try:
+            changed = self.detector.set_intrinsics_from_camera_info(data)
+        except ValueError as e:
+            self.get_logger().warn(f'{e}, keeping the previous intrinsics', throttle_duration_sec=1.0)
+            return
+
+        if changed:
+            self.get_logger().info(f'Camera intrinsics updated ({data.width}x{data.height})')
+
+
+    def multicamerainfocb(self, camera, data):
+        '''
+        Description:    Callback function for the camera info topic of a camera in multi camera mode
+
+        Args:
+            camera      (CameraStream):     camera the info belongs to
+            data        (CameraInfo):       camera info received from camera info topic
+        '''
+
+        try:
+            camera.detector.set_intrinsics_from_camera_info(data)
+        except ValueError as e:
+            self.get_logger().warn(f'{camera.namespace}: {e}, keeping the previous intrinsics', throttle_duration_sec=1.0)
 
 
     def depthimagecb(self, data):
@@ -249,10 +2145,15 @@ class aruco_tf(Node):
 
         ############################################
         
+        self.record_callback_latency('depth', data.header)
         try:
-            self.depth_image = self.bridge.imgmsg_to_cv2(data, desired_encoding='passthrough')
-        except CvBridgeError as e:
-            print(e)
+            depth_image = self.image_to_array(data)
+        except (CvBridgeError, ValueError) as e:
+            self.get_logger().error(f'Cannot convert depth image: {e}', throttle_duration_sec=1.0)
+            return
+
+        with self.image_lock:
+            self.depth_image = depth_image
         
 
 
@@ -278,88 +2179,510 @@ class aruco_tf(Node):
         #               You may use cv2 functions such as 'flip' and 'rotate' to do the same
 
         ############################################
+        self.record_callback_latency('color', data.header)
         try:
-            self.cv_image = self.bridge.imgmsg_to_cv2(data, desired_encoding='passthrough')
-        except CvBridgeError as e:
-            print(e)
+            cv_image = self.image_to_array(data)
+        except (CvBridgeError, ValueError) as e:
+            self.get_logger().error(f'Cannot convert colour image: {e}', throttle_duration_sec=1.0)
+            return
+
+        if data.encoding in GRAY_CONVERSIONS and data.encoding != self.detector.color_encoding:
+            with self.detector.lock:
+                self.detector.color_encoding = data.encoding
+
+        with self.image_lock:
+            self.cv_image = cv_image
+        self.frame_queue.put((cv_image, data.header))
+
+
+    def image_to_array(self, data):
+        '''
+        Description:    Convert ROS Image message to numpy array, as a read-only view on the message data
+                        when zero_copy_ingest is set, else as a CvBridge copy
+
+        Args:
+            data        (Image):            image message
+
+        Returns:
+            image       (numpy.ndarray):    converted image
+        '''
+
+        if self.zero_copy_ingest:
+            return image_msg_to_array(data)
+        return self.bridge.imgmsg_to_cv2(data, desired_encoding='passthrough')
+
+
+    def record_callback_latency(self, stream, header):
+        '''
+        Description:    Store time elapsed between the image header stamp and the callback being run
+
+        Args:
+            stream      (str):      'color' or 'depth'
+            header      (Header):   header of the received image
+        '''
+
+        stamp = rclpy.time.Time.from_msg(header.stamp)
+        if stamp.nanoseconds:
+            self.callback_latency[stream].append((self.get_clock().now() - stamp).nanoseconds / 1e9)
+
+
+    def latest_images(self):
+        '''
+        Description:    Thread safe snapshot of the latest colour and depth images
+
+        Returns:
+            cv_image    (numpy.ndarray):    latest colour image (None before the first frame)
+            depth_image (numpy.ndarray):    latest depth image (None before the first frame)
+        '''
+
+        with self.image_lock:
+            return self.cv_image, self.depth_image
+
+
+    def frame_worker_loop(self):
+        '''
+        Description:    Worker thread of 'event' processing mode, processes each fresh frame handed over by colorimagecb()
+
+        Args:
+        Returns:
+        '''
+
+        while rclpy.ok() and self.frame_worker_running:
+            frame = self.frame_queue.get(timeout=0.5)
+            if frame is None:
+                continue
+            self.process_frame(*frame)
+            self.frame_queue.task_done()
+
+
+    def frame_stats(self):
+        '''
+        Description:    Frame counters of the processing pipeline
+
+        Returns:
+            stats       (dict):     frames received, processed and dropped
+        '''
+
+        return self.frame_queue.stats()
+
+
+    def destroy_node(self):
+        '''
+        Description:    Stop the frame worker (if any) before destroying the node
+        '''
+
+        self.frame_worker_running = False
+        self.frame_queue.close()
+        if self.frame_worker is not None:
+            self.frame_worker.join(timeout=1.0)
+        if self.detection_pool is not None:
+            self.detection_pool.close()
+        if self.metrics_server is not None:
+            self.metrics_server.close()
+        if self.visualizer is not None:
+            self.visualizer.close()
+        if self.tf_output is not None:
+            self.tf_output.close()
+        self.get_logger().info(f'Frames: {self.frame_stats()}')
+        super().destroy_node()
+
+
+    def publish_diagnostics(self):
+        '''
+        Description:    Timer function publishing the node metrics on /diagnostics
+
+        Args:
+        Returns:
+        '''
+
+        status = DiagnosticStatus()
+        status.level = DiagnosticStatus.OK
+        status.name = self.get_name() + ': aruco pipeline'
+        status.message = 'frames ' + ', '.join(f'{key} {value}' for key, value in self.frame_stats().items())
+        status.hardware_id = 'camera_link'
+        status.values = [KeyValue(key=key, value=value) for key, value in self.metrics.key_values()]
+
+        diagnostics = DiagnosticArray()
+        diagnostics.header.stamp = self.get_clock().now().to_msg()
+        diagnostics.status = [status]
+        self.diagnostics_pub.publish(diagnostics)
 
 
     def process_image(self):
         '''
         Description:    Timer function used to detect aruco markers and publish tf on estimated poses.
+                        Only a frame which was not processed yet is used, nothing is done before the first frame arrives.
 
         Args:
         Returns:
         '''
 
-        ############ Function VARIABLES ############
+        frame = self.frame_queue.get(timeout=0)
+        if frame is None:
+            return
+        self.process_frame(*frame)
+        self.frame_queue.task_done()
 
-        # These are the variables defined from camera info topic such as image pixel size, focalX, focalY, etc.
-        # Make sure you verify these variable values once. As it may affect your result.
-        # You can find more on these variables here -> http://docs.ros.org/en/melodic/api/sensor_msgs/html/msg/CameraInfo.html
+
+    def fuse_marker_depth(self, depth_image, color_shape, center_aruco_list, distance_from_rgb_list, ids):
+        '''
+        Description:    Sample the aligned depth image around all marker centers and fuse it with the PnP distances
+                        as per 'depth_fusion' parameter
+
+        Args:
+            depth_image             (numpy.ndarray):    aligned depth image (None if not received yet)
+            color_shape             (tuple):            (height, width) of the colour frame the markers were detected on
+            center_aruco_list       (list):             center points of the markers
+            distance_from_rgb_list  (list):             PnP distance of the markers
+            ids                     (list):             marker ids
+
+        Returns:
+            distance_from_rgb_list  (list):             fused distance of the markers (unchanged without depth image)
+        '''
+
+        if depth_image is None:
+            return distance_from_rgb_list
+
+        depths = sample_marker_depth(depth_image, center_aruco_list, self.depth_patch_size, color_shape)
+        distances, agree = fuse_distances(distance_from_rgb_list, depths, self.depth_fusion, self.depth_pnp_tolerance)
+
+        for i in np.flatnonzero(~agree):
+            self.get_logger().warn(f'Marker {ids[i]}: depth {depths[i]:.3f} m, PnP {distance_from_rgb_list[i]:.3f} m',
+                                   throttle_duration_sec=1.0)
+
+        return distances.tolist()
+
+
+    def lookup_base_frame(self, marker_id, quat, stamp=None, cam_frame=None):
+        '''
+        Description:    Build base_link -> 2029_base_<marker_id> using the tf2 lookup of the 2029_cam_<marker_id> frame
+                        broadcast by this node (only available once it came back through /tf)
+
+        Args:
+            marker_id   (int):          aruco marker id
+            quat        (tuple):        orientation (qx, qy, qz, qw) of the marker
+            stamp       (Time):         stamp of the transform (current time if None)
+            cam_frame   (str):          marker frame in the camera to look up (2029_cam_<marker_id> if None)
+
+        Returns:
+            t2          (TransformStamped):     transform to publish, None if the lookup failed
+        '''
+
+        qx, qy, qz, qw = quat
+
+        #   ->  Then finally lookup transform between base_link and obj frame to publish the TF
+        #       You may use 'lookup_transform' function to pose of obj frame w.r.t base_link 
+        
+        from_frame_rel = cam_frame or '2029_cam_'+str(marker_id)                                              
+        to_frame_rel = 'base_link'                                                                   
+
+        try:
+            t1 = self.tf_buffer.lookup_transform( to_frame_rel, from_frame_rel, rclpy.time.Time())       
+            if self.log_debug:
+                self.get_logger().debug(f'Successfully received data!')
+        except tf2_ros.TransformException as e:
+            self.metrics.inc('tf_lookup_failures_total')
+            if self.log_debug:
+                self.get_logger().debug("Could not transform "+from_frame_rel+" to "+to_frame_rel)
+            return None
+        
         
-        sizeCamX = 1280
-        sizeCamY = 720
-        centerCamX = 640 
-        centerCamY = 360
-        focalX = 931.1829833984375
-        focalY = 931.1829833984375
-            
+        #   ->  And now publish TF between object frame and base_link
+        #       Use the following frame_id-
+        #           frame_id = 'base_link'
+        #           child_frame_id = 'obj_<marker_id>'          Ex: obj_20, where 20 is aruco marker ID
+
+        #t2 = TransformStamped()
+        #t2.header.stamp = self.get_clock().now().to_msg()
+        #       so that we will collect it's position w.r.t base_link in next step.
+        #       Use the following frame_id-
+        #           frame_id = 'camera_link'
+        #           child_frame_id = 'cam_<marker_id>'          Ex: cam_20, where 20 is aruco marker ID
+
+        t2 = TransformStamped()
+        t2.header.stamp = self.tf_stamp(stamp)
+
+        t2.header.frame_id = 'base_link'
+        t2.child_frame_id = '2029_base_'+str(marker_id)
+
+        # # translation
+        t2.transform.translation.x = t1.transform.translation.x
+        t2.transform.translation.y = t1.transform.translation.y                
+        t2.transform.translation.z = t1.transform.translation.z
+        # # rotation
+        t2.transform.rotation.x = qx
+        t2.transform.rotation.y = qy
+        t2.transform.rotation.z = qz
+        t2.transform.rotation.w = qw
+
+        return t2
+
+
+    def compose_base_frames(self, ids, cam_positions, marker_quats, stamp=None, camera_frame='camera_link'):
+        '''
+        Description:    Build base_link -> 2029_base_<id> for all markers of a frame from a single base_link -> camera_link
+                        lookup, composed with all marker positions at once (no round trip of the 2029_cam_<id> frames through tf2).
+                        Orientation is published as computed from the corrected aruco angle, same as lookup_base_frame().
+
+        Args:
+            ids             (list):     aruco marker ids
+            cam_positions   (list):     [x, y, z] position of each marker in camera_link
+            marker_quats    (list):     [qx, qy, qz, qw] orientation of each marker
+            stamp           (Time):     stamp of the transforms (current time if None)
+            camera_frame    (str):      tf frame the marker positions are expressed in
+
+        Returns:
+            transforms      (list):     TransformStamped to publish (empty if the lookup failed)
+        '''
+
+        try:
+            camera_tf = self.tf_buffer.lookup_transform('base_link', camera_frame, rclpy.time.Time())
+        except tf2_ros.TransformException as e:
+            self.metrics.inc('tf_lookup_failures_total')
+            if self.log_debug:
+                self.get_logger().debug("Could not transform "+camera_frame+" to base_link")
+            return []
+
+        rotation, translation = transform_to_matrix(camera_tf.transform)
+        base_positions = compose_positions(rotation, translation, cam_positions)
+        stamp = self.tf_stamp(stamp)
+
+        transforms = []
+        for marker_id, (x, y, z), (qx, qy, qz, qw) in zip(ids, base_positions, marker_quats):
+            t2 = TransformStamped()
+            t2.header.stamp = stamp
+            t2.header.frame_id = 'base_link'
+            t2.child_frame_id = '2029_base_'+str(marker_id)
+
+            t2.transform.translation.x = float(x)
+            t2.transform.translation.y = float(y)
+            t2.transform.translation.z = float(z)
+            t2.transform.rotation.x = float(qx)
+            t2.transform.rotation.y = float(qy)
+            t2.transform.rotation.z = float(qz)
+            t2.transform.rotation.w = float(qw)
+
+            transforms.append(t2)
+
+        return transforms
+
+
+    def tf_stamp(self, stamp=None):
+        '''
+        Description:    Stamp for a transform, the given (image header) stamp or else the current time
+
+        Args:
+            stamp       (Time):     stamp shared by all transforms of a frame, None to use the current time
+
+        Returns:
+            stamp       (Time):     stamp message
+        '''
+
+        if stamp is not None:
+            return stamp
+        return self.get_clock().now().to_msg()
+
+
+    def send_transforms(self, transforms):
+        '''
+        Description:    Broadcast the transforms of a frame, in a single TFMessage when batch_tf_publish is set.
+                        With the pose cache, unchanged transforms are skipped and, in static mode, the others go to /tf_static.
+
+                        /tf_static is a depth 1 transient local topic and rclpy's StaticTransformBroadcaster only publishes
+                        the transforms it is given, so the latest transform of every cached frame is kept and the whole set
+                        is sent on each change (a late joining listener only gets the last message). Frames evicted from
+                        the cache are dropped from the set, but listeners which already received them keep them:
+                        static transforms never expire in tf2.
+
+        Args:
+            transforms  (list):     TransformStamped to broadcast
+
+        Returns:
+            transforms  (list):     TransformStamped actually sent
+        '''
+
+        evicted = []
+        if self.pose_cache is not None and transforms:
+            count = len(transforms)
+            transforms = self.pose_cache.filter(transforms)
+            evicted = self.pose_cache.evicted
+            self.metrics.inc('transforms_suppressed_total', count - len(transforms))
+        if self.static_br is not None:
+            for _, child_frame_id in evicted:
+                self.static_transforms.pop(child_frame_id, None)
+            if evicted and not transforms:
+                self.static_br.sendTransform(list(self.static_transforms.values()))
+        if not transforms:
+            return transforms
+        with self.metrics.stage('tf_publish'):
+            if self.static_br is not None:
+                self.static_transforms.update((t.child_frame_id, t) for t in transforms)
+                self.static_br.sendTransform(list(self.static_transforms.values()))
+            elif self.batch_tf_publish:
+                self.br.sendTransform(transforms)
+            else:
+                for t in transforms:
+                    self.br.sendTransform(t)
+        self.metrics.inc('transforms_published_total', len(transforms))
+
+        if self.tf_output is not None:
+            self.tf_output.writelines(json.dumps(transform_to_record(t)) + '\n' for t in transforms)
+
+        return transforms
+
+
+    def process_frame(self, image, header=None):
+        '''
+        Description:    Detect aruco markers on a frame and publish tf on estimated poses.
+
+        Args:
+            image       (numpy.ndarray):    colour frame received from colorimagecb()
+            header      (Header):           header of the colour image message
+
+        Returns:
+        '''
+
+        detector = self.detector
+        start = time.perf_counter()
+        self.observe_frame_age(header)
 
         ############ ADD YOUR CODE HERE ############
 
         # INSTRUCTIONS & HELP : 
 
-        #	->  Get aruco center, distance from rgb, angle, width and ids list from 'detect_aruco_center' defined above
-        center_aruco_list, distance_from_rgb_list, angle_aruco_list, width_aruco_list, ids = detect_aruco(self.cv_image)
-        #print(center_aruco_list, distance_from_rgb_list, angle_aruco_list, width_aruco_list, ids)
+        # intrinsics must not change between detection and back projection of the frame (see ArucoDetector.lock)
+        with detector.lock:
+            if self.compare_detection_timing:
+                loop_ms, batched_ms = compare_detect_aruco_timing(image, detector=detector)
+                self.get_logger().info(f'detect_aruco loop: {loop_ms:.2f} ms, batched: {batched_ms:.2f} ms')
+
+            #	->  Get aruco center, distance from rgb, angle, width and ids list from 'detect_aruco_center' defined above
+            with self.metrics.stage('detect'):
+                if self.tracker is not None:
+                    # track timeouts follow the image stamps, so replays drop the same tracks whatever the replay speed
+                    now = self.header_seconds(header)
+                    rois = self.tracker.plan_rois(image.shape)
+                    detections = self.tracker.update(detector.detect(image, rois), detector.last_corners,
+                                                     time.monotonic() if now is None else now, rois is None)
+                else:
+                    detections = detector.detect(image)
+            self.metrics.inc('markers_detected_total', detector.last_found)
+            self.metrics.inc('markers_filtered_total', max(0, detector.last_found - len(detections[4])))
+
+            self.publish_detections(detections, header, image)
+        self.metrics.observe('stage_seconds', time.perf_counter() - start, 'process_frame')
+
+
+    def header_seconds(self, header):
+        '''
+        Description:    Stamp of an image header in seconds, None if there is no header or it is unstamped
+        '''
+
+        if header is None or not (header.stamp.sec or header.stamp.nanosec):
+            return None
+        return header.stamp.sec + header.stamp.nanosec * 1e-9
 
-        #   ->  Loop over detected box ids received to calculate position and orientation transform to publish TF 
-        for i in range(len(ids)):
-            #->  Use this equation to correct the input aruco angle received from cv2 aruco function 'estimatePoseSingleMarkers' here
-            #       It's a correction formula- 
-            #       angle_aruco = (0.788*angle_aruco) - ((angle_aruco**2)/3160)
-            #print(angle_aruco_list[i])
-            angle_aruco = (0.788*int(angle_aruco_list[i])) - ((int(angle_aruco_list[i])**2)/3160)
-            #->  Then calculate quaternions from roll pitch yaw (where, roll and pitch are 0 while yaw is corrected aruco_angle)
-            qx,qy,qz,qw = R.from_euler('xyz', [math.pi/2, 0, ((math.pi/2)-angle_aruco)]).as_quat()
-            # qx,qy,qz,qw = R.from_euler('xyz', [90, 0, 90], degrees=True).as_quat()
 
+    def observe_frame_age(self, header):
+        '''
+        Description:    Record time elapsed between the image header stamp and the frame being processed
+
+        Args:
+            header      (Header):   header of the colour image message (nothing recorded if None or unstamped)
+        '''
+
+        if header is None:
+            return
+        stamp = rclpy.time.Time.from_msg(header.stamp)
+        if stamp.nanoseconds:
+            self.metrics.observe('frame_age_seconds', (self.get_clock().now() - stamp).nanoseconds / 1e9)
+
+
+    def publish_detections(self, detections, header=None, image=None, color_shape=None, camera=None):
+        '''
+        Description:    Publish tf on estimated poses of the markers detected on a frame.
 
-            #->  Use center_aruco_list to get realsense depth and log them down. (divide by 1000 to convert mm to m)
-            cX = center_aruco_list[i][0]
-            cY = center_aruco_list[i][1]
-            distance_from_rgb = distance_from_rgb_list[i]
+        Args:
+            detections  (tuple):            five lists returned by ArucoDetector.detect
+            header      (Header):           header of the colour image message
+            image       (numpy.ndarray):    colour frame the markers were detected on, handed to the visualization sink (None to skip)
+            color_shape (tuple):            (height, width) of the colour frame when no image is given
+            camera      (CameraStream):     camera of multi camera mode, None for the single /camera (camera_link)
+
+        Returns:
+        '''
+
+        ############ Function VARIABLES ############
+
+        # These are the variables defined from camera info topic such as image pixel size, focalX, focalY, etc.
+        # They are owned by the detector and only refreshed when /camera/camera_info changes (see camerainfocb())
+        
+        detector = self.detector if camera is None else camera.detector
+        camera_frame = 'camera_link' if camera is None else camera.frame_id
 
-            #   ->  Use this formula to rectify x, y, z based on focal length, center value and size of image
-            
-            x = (distance_from_rgb * (sizeCamX - cX - centerCamX) / focalX)
-            y = (distance_from_rgb * (sizeCamY - cY - centerCamY) / focalY)
-            z = (distance_from_rgb)
+        center_aruco_list, distance_from_rgb_list, angle_aruco_list, width_aruco_list, ids = detections
+        #print(center_aruco_list, distance_from_rgb_list, angle_aruco_list, width_aruco_list, ids)
 
-            x,y,z = z,x,y
+        #   ->  Use center_aruco_list to get realsense depth of all markers at once and cross-check it against the PnP distance
+        if self.depth_fusion != 'off' and ids:
+            if camera is None:
+                _, depth_image = self.latest_images()
+            else:
+                with self.image_lock:
+                    depth_image = camera.depth_image
+            if image is not None:
+                color_shape = image.shape[:2]
+            with self.metrics.stage('depth_fusion'):
+                distance_from_rgb_list = self.fuse_marker_depth(depth_image, color_shape, center_aruco_list, distance_from_rgb_list, ids)
+
+        #   ->  Correct the aruco angles, build the quaternions and rectify x, y, z of all markers at once (see back_project_batch())
+        with self.metrics.stage('pose_math'), detector.lock:
+            marker_quats = aruco_angles_to_quaternions(correct_aruco_angle_batch(angle_aruco_list))
+            cam_positions = back_project_batch(center_aruco_list, distance_from_rgb_list, detector)
+
+        # multi camera mode: marker frames are suffixed with the camera, base frames merged across cameras (see claim_markers())
+        cam_frame_suffix = '' if camera is None else camera.cam_frame_suffix
+        owned = [True] * len(ids) if camera is None else self.claim_markers(camera, ids, distance_from_rgb_list)
+
+        # transforms of this frame, sent together after the loop (see send_transforms())
+        # batched transforms share the stamp of the image instead of the time they were built at
+        transforms = []
+        frame_stamp = None
+        if self.batch_tf_publish:
+            if header is not None and (header.stamp.sec or header.stamp.nanosec):
+                frame_stamp = header.stamp
+            else:
+                frame_stamp = self.get_clock().now().to_msg()
 
-            print(x,y,z)
+        #   ->  Loop over detected box ids received to build the transforms to publish TF 
+        for i in range(len(ids)):
+            #->  Angle correction formula- 
+            #       angle_aruco = (0.788*angle_aruco) - ((angle_aruco**2)/3160)
+            #    and quaternions from roll pitch yaw (where, roll and pitch are 0 while yaw is corrected aruco_angle) were computed above
+            qx,qy,qz,qw = marker_quats[i]
 
-            #       where, 
+            #   ->  x, y, z were rectified above based on focal length, center value and size of image, with
             #               cX, and cY from 'center_aruco_list'
-            #               distance_from_rgb is depth of object calculated in previous step
-            #               sizeCamX, sizeCamY, centerCamX, centerCamY, focalX and focalY are defined above
-            center_coords = (int(cX),int(cY))
-            #   ->  Now, mark the center points on image frame using cX and cY variables with help of 'cv2.cirle' function
-            cv2.circle(self.cv_image,center_coords,10,(255,0,0),-1)
-            cv2.putText(self.cv_image,"center",center_coords,cv2.FONT_HERSHEY_SIMPLEX,1,(255,255,255),2,cv2.LINE_AA)
+            #               distance_from_rgb from 'distance_from_rgb_list'
+            #               centerCamX, centerCamY (principal point), focalX and focalY of the detector
+            #       and already swapped to camera_link axes (x,y,z = z,x,y)
+            x,y,z = cam_positions[i].tolist()
+
+            if self.log_debug:
+                self.get_logger().debug(f'{ids[i]}: {x} {y} {z}')
+
+            #   ->  Center points are marked with 'cv2.circle' on a copy of the frame by the visualization sink (see draw_detections())
             #   ->  Here, till now you receive coordinates from camera_link to aruco marker center position. 
 
             #       So, publish this transform w.r.t. camera_link using Geometry Message - TransformStamped 
             t = TransformStamped()
-            t.header.stamp = self.get_clock().now().to_msg()
+            t.header.stamp = self.tf_stamp(frame_stamp)
             #       so that we will collect it's position w.r.t base_link in next step.
             #       Use the following frame_id-
             #           frame_id = 'camera_link'
             #           child_frame_id = 'cam_<marker_id>'          Ex: cam_20, where 20 is aruco marker ID
-            t.header.frame_id = 'camera_link'
-            t.child_frame_id = '2029_cam_'+str(ids[i])
+            t.header.frame_id = camera_frame
+            t.child_frame_id = '2029_cam_'+str(ids[i])+cam_frame_suffix
 
             # translation
             t.transform.translation.x = x
@@ -371,57 +2694,28 @@ class aruco_tf(Node):
             t.transform.rotation.z = 0.0
             t.transform.rotation.w = 1.0
 
-            self.br.sendTransform(t)
+            transforms.append(t)
 
             #   ->  Then finally lookup transform between base_link and obj frame to publish the TF
-            #       You may use 'lookup_transform' function to pose of obj frame w.r.t base_link 
-            
-            from_frame_rel = '2029_cam_'+str(ids[i])                                              
-            to_frame_rel = 'base_link'                                                                   
-
-            try:
-                t1 = self.tf_buffer.lookup_transform( to_frame_rel, from_frame_rel, rclpy.time.Time())       
-                self.get_logger().info(f'Successfully received data!')
-            except tf2_ros.TransformException as e:
-                self.get_logger().info("Could not transform "+from_frame_rel+" to "+to_frame_rel)
-                continue
-            
-            
-            #   ->  And now publish TF between object frame and base_link
-            #       Use the following frame_id-
-            #           frame_id = 'base_link'
-            #           child_frame_id = 'obj_<marker_id>'          Ex: obj_20, where 20 is aruco marker ID
-
-            #t2 = TransformStamped()
-            #t2.header.stamp = self.get_clock().now().to_msg()
-            #       so that we will collect it's position w.r.t base_link in next step.
-            #       Use the following frame_id-
-            #           frame_id = 'camera_link'
-            #           child_frame_id = 'cam_<marker_id>'          Ex: cam_20, where 20 is aruco marker ID
-
-            t2 = TransformStamped()
-            t2.header.stamp = self.get_clock().now().to_msg()
-
-            t2.header.frame_id = 'base_link'
-            t2.child_frame_id = '2029_base_'+str(ids[i])
-
-            # # translation
-            t2.transform.translation.x = t1.transform.translation.x
-            t2.transform.translation.y = t1.transform.translation.y                
-            t2.transform.translation.z = t1.transform.translation.z
-            # # rotation
-            t2.transform.rotation.x = qx
-            t2.transform.rotation.y = qy
-            t2.transform.rotation.z = qz
-            t2.transform.rotation.w = qw
-
-            self.br.sendTransform(t2)
-            
-
-            #   ->  At last show cv2 image window having detected markers drawn and center points located using 'cv2.imshow' function.
-            #       Refer MD book on portal for sample image -> https://portal.e-yantra.org/
-            cv2.imshow("Color image",self.cv_image)
-            cv2.waitKey(1)
+            if owned[i] and not self.local_tf_composition:
+                t2 = self.lookup_base_frame(ids[i], (float(qx), float(qy), float(qz), float(qw)), frame_stamp, t.child_frame_id)
+                if t2 is not None:
+                    transforms.append(t2)
+
+        if self.local_tf_composition and any(owned):
+            mask = np.array(owned)
+            owned_ids = [marker_id for marker_id, own in zip(ids, owned) if own]
+            transforms.extend(self.compose_base_frames(owned_ids, cam_positions[mask], marker_quats[mask], frame_stamp, camera_frame))
+
+        # markers whose base_link pose was actually sent (not failed lookups, nor suppressed by the pose cache)
+        sent = self.send_transforms(transforms)
+        self.metrics.inc('markers_published_total', sum(t.header.frame_id == 'base_link' for t in sent))
+
+        #   ->  At last show cv2 image window having detected markers drawn and center points located, once per frame and rate limited.
+        #       Refer MD book on portal for sample image -> https://portal.e-yantra.org/
+        if self.visualizer is not None and image is not None:
+            self.visualizer.submit(image, (detector.last_corners, detector.last_ids, detector.last_rvecs, detector.last_tvecs, detector),
+                                   detector.color_encoding, header)
 
         #   ->  NOTE:   The Z axis of TF should be pointing inside the box (Purpose of this will be known in task 1B)
         #               Also, auto eval script will be judging angular difference aswell. So, make sure that Z axis is inside the box (Refer sample images on Portal - MD book)
@@ -431,6 +2725,25 @@ class aruco_tf(Node):
 
 ##################### FUNCTION DEFINITION #######################
 
+def create_executor(node):
+    '''
+    Description:    Create the executor selected by the 'executor' parameter of the node and add the node to it
+
+    Args:
+        node        (aruco_tf):     node to be spun
+
+    Returns:
+        executor    (Executor):     SingleThreadedExecutor or MultiThreadedExecutor holding the node
+    '''
+
+    if node.get_parameter('executor').value == 'multi':
+        executor = MultiThreadedExecutor(num_threads=node.get_parameter('executor_threads').value)
+    else:
+        executor = SingleThreadedExecutor()
+    executor.add_node(node)
+    return executor
+
+
 def main():
     '''
     Description:    Main function which creates a ROS node and spin around for the aruco_tf class to perform it's task
@@ -444,7 +2757,9 @@ def main():
 
     aruco_tf_class = aruco_tf()                                     # creating a new object for class 'aruco_tf'
 
-    rclpy.spin(aruco_tf_class)                                      # spining on the object to make it alive in ROS 2 DDS
+    executor = create_executor(aruco_tf_class)                      # single or multi threaded executor as per 'executor' parameter
+
+    executor.spin()                                                 # spining on the object to make it alive in ROS 2 DDS
 
     aruco_tf_class.destroy_node()                                   # destroy node after spin ends
 
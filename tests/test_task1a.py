@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+
+'''
+Description:    Tests of the order and time dependent parts of task1a.py which need no ROS: PoseCache (publish,
+                suppress, keepalive, TTL and LRU eviction and the /tf_static set of send_transforms()) and LatestFrameQueue.
+                Transforms are plain objects with the TransformStamped attributes read by the node.
+
+Usage:          python3 -m pytest -q tests
+'''
+
+import os
+import sys
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+# task1a imports the detection stack at module level
+pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+pytest.importorskip('scipy')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from task1a import PoseCache, LatestFrameQueue, Metrics, aruco_tf
+
+
+def make_transform(child_frame_id, stamp, x=0.0, qz=0.0, frame_id='base_link'):
+    '''
+    Description:    TransformStamped-like object, translated by x along X and rotated by qz (quaternion z component)
+    '''
+
+    sec = int(stamp)
+    return SimpleNamespace(
+        header=SimpleNamespace(frame_id=frame_id, stamp=SimpleNamespace(sec=sec, nanosec=int(round((stamp - sec) * 1e9)))),
+        child_frame_id=child_frame_id,
+        transform=SimpleNamespace(translation=SimpleNamespace(x=x, y=0.0, z=0.0),
+                                  rotation=SimpleNamespace(x=0.0, y=0.0, z=qz, w=(1.0 - qz * qz) ** 0.5)))
+
+
+def children(transforms):
+    return [t.child_frame_id for t in transforms]
+
+
+class FakeBroadcaster():
+    """Records each list of transforms sent"""
+
+    def __init__(self):
+        self.sent = []
+
+    def sendTransform(self, transforms):
+        self.sent.append(children(transforms))
+
+
+def static_node(cache):
+    '''
+    Description:    Stand-in for the aruco_tf attributes read by send_transforms() with pose_cache_static set
+    '''
+
+    return SimpleNamespace(pose_cache=cache, static_br=FakeBroadcaster(), static_transforms={}, metrics=Metrics(),
+                           br=FakeBroadcaster(), batch_tf_publish=True, tf_output=None)
+
+
+############ PoseCache ############
+
+def test_unchanged_pose_is_suppressed():
+    cache = PoseCache(keepalive=0)
+
+    assert children(cache.filter([make_transform('a', 1.0)])) == ['a']
+    assert cache.filter([make_transform('a', 1.1, x=0.001)]) == []
+    assert cache.suppressed == 1
+
+
+def test_moved_pose_is_published():
+    cache = PoseCache(translation_threshold=0.005, rotation_threshold=0.01, keepalive=0)
+    cache.filter([make_transform('a', 1.0)])
+
+    assert children(cache.filter([make_transform('a', 1.1, x=0.01)])) == ['a']
+    assert children(cache.filter([make_transform('a', 1.2, x=0.01, qz=0.01)])) == ['a']            # 0.02 rad
+    # compared to the last published pose, not the last seen one
+    assert cache.filter([make_transform('a', 1.3, x=0.013, qz=0.01)]) == []
+    assert children(cache.filter([make_transform('a', 1.4, x=0.016, qz=0.01)])) == ['a']
+
+
+def test_keepalive_republishes_unchanged_pose():
+    cache = PoseCache(keepalive=1.0, ttl=10.0)
+    cache.filter([make_transform('a', 1.0)])
+
+    assert cache.filter([make_transform('a', 1.5)]) == []
+    assert children(cache.filter([make_transform('a', 2.0)])) == ['a']
+    # keepalive counts from the last publication
+    assert cache.filter([make_transform('a', 2.5)]) == []
+
+
+def test_ttl_eviction_forgets_frame():
+    cache = PoseCache(keepalive=0, ttl=5.0)
+    cache.filter([make_transform('a', 1.0), make_transform('b', 1.0)])
+
+    assert cache.filter([make_transform('b', 5.0)]) == []
+    assert cache.evicted == []
+
+    # 'a' was last seen 6 s ago: evicted, and published again as a new frame
+    assert children(cache.filter([make_transform('a', 7.0)])) == ['a']
+    assert cache.evicted == [('base_link', 'a')]
+    assert list(cache.entries) == [('base_link', 'b'), ('base_link', 'a')]
+
+
+def test_ttl_eviction_runs_before_lru_trimming():
+    cache = PoseCache(keepalive=0, ttl=5.0, max_size=2)
+    cache.filter([make_transform('a', 1.0)])
+    cache.filter([make_transform('b', 5.0)])
+
+    # 'a' expires first, then the least recently seen of b, c, d is trimmed
+    cache.filter([make_transform('c', 7.0), make_transform('d', 7.0)])
+    assert cache.evicted == [('base_link', 'a'), ('base_link', 'b')]
+    assert list(cache.entries) == [('base_link', 'c'), ('base_link', 'd')]
+
+
+def test_lru_trimming_keeps_recently_seen_frames():
+    cache = PoseCache(keepalive=0, ttl=10.0, max_size=2)
+    cache.filter([make_transform('a', 1.0), make_transform('b', 1.0)])
+    cache.filter([make_transform('a', 2.0)])                                            # 'b' is now the least recently seen
+
+    cache.filter([make_transform('c', 3.0)])
+    assert cache.evicted == [('base_link', 'b')]
+
+    # evicted only lists the frames of the last call
+    cache.filter([make_transform('a', 4.0)])
+    assert cache.evicted == []
+
+
+def test_frames_are_keyed_by_parent_and_child():
+    cache = PoseCache(keepalive=0)
+
+    published = cache.filter([make_transform('a', 1.0), make_transform('a', 1.0, frame_id='camera_link')])
+    assert len(published) == 2
+
+
+############ send_transforms() with pose_cache_static ############
+
+def test_static_set_is_republished_whole():
+    node = static_node(PoseCache(keepalive=0, ttl=10.0))
+
+    aruco_tf.send_transforms(node, [make_transform('a', 1.0), make_transform('b', 1.0)])
+    # only 'a' moved, but the whole set goes out so late joiners get every frame
+    sent = aruco_tf.send_transforms(node, [make_transform('a', 1.1, x=0.1), make_transform('b', 1.1)])
+
+    assert children(sent) == ['a']
+    assert node.static_br.sent == [['a', 'b'], ['a', 'b']]
+    assert node.static_transforms['a'].transform.translation.x == 0.1
+    assert node.br.sent == []
+
+
+def test_static_set_not_sent_when_unchanged():
+    node = static_node(PoseCache(keepalive=0, ttl=10.0))
+
+    aruco_tf.send_transforms(node, [make_transform('a', 1.0)])
+    assert aruco_tf.send_transforms(node, [make_transform('a', 1.1)]) == []
+    assert node.static_br.sent == [['a']]
+    assert node.metrics.counters['transforms_suppressed_total'] == 1
+
+
+def test_static_set_drops_evicted_frames():
+    node = static_node(PoseCache(keepalive=0, ttl=5.0))
+
+    aruco_tf.send_transforms(node, [make_transform('a', 1.0), make_transform('b', 1.0)])
+    aruco_tf.send_transforms(node, [make_transform('b', 5.0)])
+
+    # 'a' expires while 'b' is unchanged: the reduced set is sent although nothing was published
+    assert aruco_tf.send_transforms(node, [make_transform('b', 7.0)]) == []
+    assert node.static_br.sent == [['a', 'b'], ['b']]
+    assert list(node.static_transforms) == ['b']
+
+
+############ LatestFrameQueue ############
+
+def test_frame_queue_keeps_latest_frame():
+    frames = LatestFrameQueue()
+
+    frames.put('f1')
+    frames.put('f2')
+    assert frames.get(timeout=0) == 'f2'
+    frames.task_done()
+
+    # a frame is only handed out once
+    assert frames.get(timeout=0) is None
+    assert frames.stats() == {'received': 2, 'processed': 1, 'dropped': 1}
+
+
+def test_frame_queue_counts_no_drop_when_consumed():
+    frames = LatestFrameQueue()
+
+    for frame in ('f1', 'f2', 'f3'):
+        frames.put(frame)
+        assert frames.get(timeout=0) == frame
+        frames.task_done()
+    assert frames.stats() == {'received': 3, 'processed': 3, 'dropped': 0}
+
+
+def test_frame_queue_get_times_out():
+    assert LatestFrameQueue().get(timeout=0.01) is None
+
+
+def test_frame_queue_wakes_waiting_consumer():
+    frames = LatestFrameQueue()
+    received = []
+    consumer = threading.Thread(target=lambda: received.append(frames.get()))
+    consumer.start()
+
+    frames.put('f1')
+    consumer.join(timeout=5)
+    assert received == ['f1']
+
+
+def test_frame_queue_close_releases_consumer():
+    frames = LatestFrameQueue()
+    received = []
+    consumer = threading.Thread(target=lambda: received.append(frames.get()))
+    consumer.start()
+
+    frames.close()
+    consumer.join(timeout=5)
+    assert not consumer.is_alive()
+    assert received == [None]
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+
+'''
+Description:    Offline auto-tuning of the aruco detector parameters of task1a.py, runnable without ROS.
+
+                Sweeps the adaptive threshold window range and step, the corner refinement method and the minimum
+                marker perimeter over a frame set (synthetic frames with ground truth, a directory of recorded images or
+                a video, as in bench_offline.py) and reports the Pareto front of p50 frame latency against detection rate
+                and pose (distance) error. Recorded frames have no ground truth: their detection rate is relative to the
+                configuration detecting the most markers and the pose error is not reported.
+
+                Each configuration of the front is printed as the JSON object taken by the detector_params parameter of
+                the node (applied over detector_profile), Ex: ros2 run ... --ros-args -p detector_params:='<json>'.
+
+Usage:          python3 tools/autotune.py --synthetic 50 [--markers 6] [--seed 0]
+                python3 tools/autotune.py --images <dir> [--win-min 3,5,7] [--win-max 7,15,23,33] [--win-step 4,10]
+'''
+
+import sys
+import json
+import argparse
+import itertools
+
+import cv2
+import numpy as np
+
+from bench_offline import synthetic_source, image_dir_source, video_source, run, accuracy, percentiles_ms
+from task1a import ArucoDetector
+
+
+REFINEMENT_METHODS = {'none': cv2.aruco.CORNER_REFINE_NONE, 'subpix': cv2.aruco.CORNER_REFINE_SUBPIX}
+
+
+def parse_list(text, cast):
+    return [cast(value) for value in text.split(',') if value.strip()]
+
+
+def sweep_configs(args):
+    '''
+    Description:    Detector parameter sets to evaluate. Window ranges with WinSizeMax < WinSizeMin are skipped and a
+                    single window (Min == Max) is only evaluated once, whatever the step.
+
+    Returns:
+        configs     (list):     dicts of cv2.aruco.DetectorParameters attributes
+    '''
+
+    configs = []
+    seen = set()
+    for win_min, win_max, win_step, refinement, perimeter in itertools.product(
+            args.win_min, args.win_max, args.win_step, args.refinement, args.min_perimeter):
+        if win_max < win_min:
+            continue
+        if win_max == win_min:
+            win_step = 10
+        config = {'adaptiveThreshWinSizeMin': win_min,
+                  'adaptiveThreshWinSizeMax': win_max,
+                  'adaptiveThreshWinSizeStep': win_step,
+                  'cornerRefinementMethod': REFINEMENT_METHODS[refinement],
+                  'minMarkerPerimeterRate': perimeter}
+        key = tuple(config.values())
+        if key not in seen:
+            seen.add(key)
+            configs.append(config)
+    return configs
+
+
+class _Quiet():
+    """Logger dropping the per frame 'No ArUco marker detected' messages of the detector during the sweep"""
+
+    def debug(self, *args, **kwargs):
+        pass
+
+
+def evaluate(detector_kwargs, config, frames, color_encoding):
+    '''
+    Description:    Latency, markers found and pose error of one parameter set over all frames
+
+    Returns:
+        result      (dict):     config, p50 / p99 frame latency (ms), markers found, expected markers (None without
+                                ground truth), detection rate and mean camera_link position error (m, nan without ground truth)
+    '''
+
+    detector = ArucoDetector(detector_params=config, **detector_kwargs)
+    detector.color_encoding = color_encoding
+    detector.draw = False
+    detector.logger = _Quiet()
+    detector.detect(frames[0][0])                                                       # warm up
+
+    timer, results = run(detector, frames, draw=False)
+    p50, p99 = percentiles_ms(timer.samples['total'])
+    found = sum(len(detections[4]) for detections, _ in results)
+
+    result = {'config': config, 'p50': p50, 'p99': p99, 'found': found, 'expected': None, 'error': float('nan')}
+    if results[0][1] is not None:
+        expected, found, _, _, position_errors, _ = accuracy(results, detector)
+        result.update(expected=expected, found=found)
+        if position_errors.size:
+            result['error'] = float(position_errors.mean())
+    return result
+
+
+def pareto_front(results):
+    '''
+    Description:    Results not dominated by another one (lower or equal latency, higher or equal detection rate
+                    and lower or equal pose error, strictly better in at least one of them)
+    '''
+
+    def objectives(result):
+        error = result['error'] if not np.isnan(result['error']) else 0.0
+        return result['p50'], -result['rate'], error
+
+    front = []
+    for result in results:
+        own = objectives(result)
+        dominated = False
+        for other in results:
+            theirs = objectives(other)
+            if other is not result and all(t <= o for t, o in zip(theirs, own)) and theirs != own:
+                dominated = True
+                break
+        if not dominated:
+            front.append(result)
+    return sorted(front, key=lambda result: result['p50'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--images', help='directory of images')
+    source.add_argument('--video', help='video file')
+    source.add_argument('--synthetic', type=int, default=50, help='number of synthetic frames (default)')
+    parser.add_argument('--markers', type=int, default=6, help='markers per synthetic frame')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic generator')
+    parser.add_argument('--dictionary', default='DICT_4X4_50', help='predefined cv2.aruco dictionary')
+    parser.add_argument('--marker-size', type=float, default=0.15, help='side length of the markers (m)')
+    parser.add_argument('--area-threshold', type=float, default=1500, help='markers with a smaller area (pixels) are ignored')
+    parser.add_argument('--win-min', type=lambda text: parse_list(text, int), default=[3, 5, 7], help='adaptiveThreshWinSizeMin values')
+    parser.add_argument('--win-max', type=lambda text: parse_list(text, int), default=[7, 15, 23, 33], help='adaptiveThreshWinSizeMax values')
+    parser.add_argument('--win-step', type=lambda text: parse_list(text, int), default=[4, 10], help='adaptiveThreshWinSizeStep values')
+    parser.add_argument('--refinement', type=lambda text: parse_list(text, str), default=['none', 'subpix'], help='corner refinement methods (none, subpix)')
+    parser.add_argument('--min-perimeter', type=lambda text: parse_list(text, float), default=[0.02, 0.05, 0.08], help='minMarkerPerimeterRate values')
+    parser.add_argument('--all', action='store_true', help='print every configuration, not only the Pareto front')
+    args = parser.parse_args()
+
+    detector_kwargs = {'aruco_area_threshold': args.area_threshold, 'size_of_aruco_m': args.marker_size, 'dictionary': args.dictionary}
+    reference = ArucoDetector(**detector_kwargs)
+
+    if args.images:
+        reference.color_encoding = 'bgr8'
+        frames = list(image_dir_source(args.images))
+    elif args.video:
+        reference.color_encoding = 'bgr8'
+        frames = list(video_source(args.video))
+    else:
+        frames = list(synthetic_source(reference, args.synthetic, args.markers, args.seed))
+
+    if not frames:
+        sys.exit('No frames to tune on')
+
+    configs = sweep_configs(args)
+    print(f'{len(configs)} configurations, {len(frames)} frames')
+
+    results = []
+    for i, config in enumerate(configs):
+        results.append(evaluate(detector_kwargs, config, frames, reference.color_encoding))
+        print(f'\r{i + 1}/{len(configs)}', end='', file=sys.stderr, flush=True)
+    print(file=sys.stderr)
+
+    # without ground truth, detection rate is relative to the configuration finding the most markers
+    most_found = max(result['found'] for result in results) or 1
+    for result in results:
+        result['rate'] = result['found'] / result['expected'] if result['expected'] else result['found'] / most_found
+
+    shown = sorted(results, key=lambda result: result['p50']) if args.all else pareto_front(results)
+    print(f'{"p50 ms":>8}{"p99 ms":>8}{"rate":>7}{"err mm":>8}  detector_params')
+    for result in shown:
+        print(f'{result["p50"]:>8.2f}{result["p99"]:>8.2f}{result["rate"]:>7.3f}{result["error"] * 1000:>8.1f}  '
+              f'{json.dumps(result["config"], separators=(",", ":"))}')
+
+
+if __name__ == '__main__':
+    main()
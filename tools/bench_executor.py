@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+
+'''
+Description:    Benchmark of image callback latency of the aruco_tf node under the single threaded and the
+                multi threaded executor.
+
+                A publisher node (spun on its own thread) sends synthetic 1280x720 colour frames with aruco markers
+                and depth frames stamped with the current time. The time from header stamp to colorimagecb() /
+                depthimagecb() is collected by the node and reported as p50 / p99 / max for both executors.
+
+Usage:          python3 tools/bench_executor.py [--rate 30] [--duration 10] [--threads 4] [--mode timer|event]
+'''
+
+import os
+import sys
+import time
+import array
+import argparse
+import threading
+
+import cv2
+import rclpy
+import numpy as np
+from rclpy.node import Node
+from rclpy.parameter import Parameter
+from rclpy.executors import SingleThreadedExecutor
+from sensor_msgs.msg import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from task1a import aruco_tf, create_executor
+
+
+def synthetic_frames(width=1280, height=720):
+    '''
+    Description:    Colour frame with a row of DICT_4X4_50 markers and a flat depth frame (1 m)
+
+    Returns:
+        color       (numpy.ndarray):    rgb8 frame
+        depth       (numpy.ndarray):    16UC1 frame in mm
+    '''
+
+    color = np.full((height, width, 3), 200, np.uint8)
+    aruco_dict = cv2.aruco.getPredefinedDictionary(cv2.aruco.DICT_4X4_50)
+    for marker_id, x in enumerate(range(80, width - 200, 240)):
+        marker = cv2.aruco.drawMarker(aruco_dict, marker_id, 150)
+        color[250:400, x:x + 150] = marker[:, :, np.newaxis]
+    depth = np.full((height, width), 1000, np.uint16)
+    return color, depth
+
+
+def to_image_msg(frame, encoding, stamp_ns=None, frame_id=''):
+    '''
+    Description:    Build a sensor_msgs/Image from a numpy frame, stamped stamp_ns nanoseconds after the epoch
+                    (left unstamped when None, Ex: stamped on publish)
+    '''
+
+    msg = Image()
+    if stamp_ns is not None:
+        msg.header.stamp.sec, msg.header.stamp.nanosec = divmod(stamp_ns, 10**9)
+    msg.header.frame_id = frame_id
+    msg.height, msg.width = frame.shape[:2]
+    msg.encoding = encoding
+    msg.step = frame.strides[0]
+    msg.data = array.array('B', frame.tobytes())
+    return msg
+
+
+class FramePublisher(Node):
+    '''
+    ___CLASS___
+
+    Description:    Publishes the synthetic colour and depth frames at a fixed rate, stamped on publish
+    '''
+
+    def __init__(self, rate):
+        super().__init__('bench_frame_publisher')
+        color, depth = synthetic_frames()
+        self.color_msg = to_image_msg(color, 'rgb8')
+        self.depth_msg = to_image_msg(depth, '16UC1')
+        self.color_pub = self.create_publisher(Image, '/camera/color/image_raw', 10)
+        self.depth_pub = self.create_publisher(Image, '/camera/aligned_depth_to_color/image_raw', 10)
+        self.timer = self.create_timer(1.0 / rate, self.publish)
+
+
+    def publish(self):
+        stamp = self.get_clock().now().to_msg()
+        self.color_msg.header.stamp = stamp
+        self.depth_msg.header.stamp = stamp
+        self.color_pub.publish(self.color_msg)
+        self.depth_pub.publish(self.depth_msg)
+
+
+def run(executor_mode, args):
+    '''
+    Description:    Spin an aruco_tf node with the given executor for args.duration seconds
+
+    Returns:
+        latency     (dict):     callback latencies in seconds per stream
+        frames      (dict):     frame counters of the node
+    '''
+
+    node = aruco_tf(parameter_overrides=[Parameter('executor', value=executor_mode),
+                                         Parameter('executor_threads', value=args.threads),
+                                         Parameter('processing_mode', value=args.mode),
+                                         Parameter('visualization', value='off')])
+    executor = create_executor(node)
+
+    publisher = FramePublisher(args.rate)
+    publisher_executor = SingleThreadedExecutor()
+    publisher_executor.add_node(publisher)
+    publisher_thread = threading.Thread(target=publisher_executor.spin, daemon=True)
+    publisher_thread.start()
+
+    end = time.monotonic() + args.duration
+    while time.monotonic() < end:
+        executor.spin_once(timeout_sec=0.1)
+
+    publisher_executor.shutdown()
+    executor.shutdown()
+    latency = {stream: np.array(samples) for stream, samples in node.callback_latency.items()}
+    frames = node.frame_stats()
+    publisher.destroy_node()
+    node.destroy_node()
+
+    return latency, frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rate', type=float, default=30.0, help='publish rate of the synthetic camera (Hz)')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per executor')
+    parser.add_argument('--threads', type=int, default=4, help='threads of the multi threaded executor')
+    parser.add_argument('--mode', default='timer', choices=['timer', 'event'], help='processing_mode of the node')
+    args = parser.parse_args()
+
+    rclpy.init()
+    try:
+        print(f'{"executor":<10}{"stream":<8}{"n":>6}{"p50 ms":>10}{"p99 ms":>10}{"max ms":>10}   frames')
+        for executor_mode in ('single', 'multi'):
+            latency, frames = run(executor_mode, args)
+            for stream, samples in latency.items():
+                if samples.size == 0:
+                    print(f'{executor_mode:<10}{stream:<8}{0:>6}')
+                    continue
+                p50, p99 = np.percentile(samples, [50, 99]) * 1000.0
+                print(f'{executor_mode:<10}{stream:<8}{samples.size:>6}{p50:>10.2f}{p99:>10.2f}{samples.max() * 1000.0:>10.2f}   {frames}')
+    finally:
+        rclpy.shutdown()
+
+
+if __name__ == '__main__':
+    main()
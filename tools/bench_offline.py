@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+
+'''
+Description:    Offline benchmark of the aruco detection and pose pipeline of task1a.py, runnable without ROS.
+
+                Frames are read from a directory of images, a video file, or rendered by a synthetic generator
+                which places DICT_4X4_50 markers at known poses in front of the gazebo camera.
+                Reports p50 / p99 latency of each stage (grayscale, detection, area filtering, pose, angle correction,
+                quaternion, back projection), throughput, peak memory and, for synthetic frames, accuracy against the ground truth poses.
+
+Usage:          python3 tools/bench_offline.py --synthetic 200 [--markers 6] [--seed 0]
+                python3 tools/bench_offline.py --images <dir>
+                python3 tools/bench_offline.py --video <file>
+'''
+
+import os
+import sys
+import math
+import glob
+import time
+import argparse
+import resource
+import tracemalloc
+from collections import defaultdict
+
+import cv2
+import numpy as np
+from scipy.spatial.transform import Rotation as R
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from task1a import ArucoDetector, correct_aruco_angle_batch, aruco_angles_to_quaternions, back_project_batch, marker_yaw_batch
+
+
+class StageTimer():
+    '''
+    ___CLASS___
+
+    Description:    Collects durations of named stages (used as ArucoDetector.stage_timer)
+    '''
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+
+    def stage(self, name):
+        return _Stage(self.samples[name])
+
+
+class _Stage():
+    def __init__(self, samples):
+        self.samples = samples
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.samples.append(time.perf_counter() - self.start)
+        return False
+
+
+def marker_object_points(size_of_aruco_m):
+    '''
+    Description:    Corners of a marker in its own frame, in the order used by 'estimatePoseSingleMarkers'
+    '''
+
+    half = size_of_aruco_m / 2.0
+    return np.array([[-half, half, 0.0], [half, half, 0.0], [half, -half, 0.0], [-half, -half, 0.0]])
+
+
+def render_synthetic_frame(rng, detector, n_markers, width=1280, height=720, marker_px=120):
+    '''
+    Description:    Render DICT_4X4_50 markers facing the camera at random distances and yaw angles
+
+    Args:
+        rng         (numpy.random.Generator):   random generator
+        detector    (ArucoDetector):            provides camera intrinsics and marker size
+        n_markers   (int):                      markers per frame, spread across the image
+
+    Returns:
+        frame       (numpy.ndarray):    rgb8 frame
+        truth       (list):             (marker id, tvec, rvec) of each rendered marker
+    '''
+
+    frame = np.full((height, width), 128, np.uint8)
+    frame = np.clip(frame + rng.normal(0, 4, frame.shape), 0, 255).astype(np.uint8)
+
+    border = marker_px // 6
+    src = np.float32([[border, border], [border + marker_px, border],
+                      [border + marker_px, border + marker_px], [border, border + marker_px]])
+    object_points = marker_object_points(detector.size_of_aruco_m)
+
+    truth = []
+    marker_ids = rng.choice(50, size=n_markers, replace=False)
+    for slot, marker_id in enumerate(marker_ids):
+        z = rng.uniform(0.6, 1.4)
+        # spread markers horizontally in the field of view so they don't overlap
+        u = (slot + 0.5) / n_markers * width
+        x = (u - detector.centerCamX) * z / detector.focalX
+        y = rng.uniform(-0.1, 0.1)
+        yaw = rng.uniform(-0.4, 0.4)
+
+        rvec = (R.from_euler('y', yaw) * R.from_euler('x', np.pi)).as_rotvec()
+        tvec = np.array([x, y, z])
+        projected, _ = cv2.projectPoints(object_points, rvec, tvec, detector.cam_mat, detector.dist_mat)
+
+        marker = cv2.aruco.drawMarker(detector.aruco_dict, int(marker_id), marker_px)
+        padded = cv2.copyMakeBorder(marker, border, border, border, border, cv2.BORDER_CONSTANT, value=255)
+        homography = cv2.getPerspectiveTransform(src, projected.reshape(4, 2).astype(np.float32))
+        warped = cv2.warpPerspective(padded, homography, (width, height))
+        mask = cv2.warpPerspective(np.full_like(padded, 255), homography, (width, height)) > 0
+        frame[mask] = warped[mask]
+
+        truth.append((int(marker_id), tvec, rvec))
+
+    return np.ascontiguousarray(np.stack([frame] * 3, axis=-1)), truth
+
+
+def synthetic_source(detector, n_frames, n_markers, seed):
+    rng = np.random.default_rng(seed)
+    for _ in range(n_frames):
+        yield render_synthetic_frame(rng, detector, n_markers)
+
+
+def image_dir_source(path):
+    for filename in sorted(glob.glob(os.path.join(path, '*'))):
+        frame = cv2.imread(filename)
+        if frame is not None:
+            yield frame, None
+
+
+def video_source(path):
+    capture = cv2.VideoCapture(path)
+    while True:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        yield frame, None
+    capture.release()
+
+
+def percentiles_ms(samples):
+    samples = np.asarray(samples) * 1000.0
+    return np.percentile(samples, 50), np.percentile(samples, 99)
+
+
+def run(detector, frames, draw):
+    '''
+    Description:    Run detection and pose math on every frame, timing each stage
+
+    Returns:
+        timer       (StageTimer):   per stage durations (plus 'total' per frame)
+        results     (list):         (detections, truth) per frame
+    '''
+
+    timer = StageTimer()
+    detector.stage_timer = timer
+    results = []
+
+    for frame, truth in frames:
+        if not draw:
+            frame.flags.writeable = False                                               # detector skips drawing on read-only frames
+
+        start = time.perf_counter()
+        detections = detector.detect(frame)
+        center_aruco_list, distance_from_rgb_list, angle_aruco_list, width_aruco_list, ids = detections
+
+        with timer.stage('angle_correction'):
+            angles = correct_aruco_angle_batch(angle_aruco_list)
+        with timer.stage('quaternion'):
+            quats = aruco_angles_to_quaternions(angles)
+        with timer.stage('back_projection'):
+            positions = back_project_batch(center_aruco_list, distance_from_rgb_list, detector)
+
+        timer.samples['total'].append(time.perf_counter() - start)
+        results.append((detections, truth))
+
+    detector.stage_timer = None
+    return timer, results
+
+
+def accuracy(results, detector):
+    '''
+    Description:    Detection rate, false positives and pose errors against synthetic ground truth.
+                    Positions are compared in camera_link, as published by the node (back_project_batch() of the detected
+                    centers and distances against the ground truth tvec), yaw against marker_yaw_batch() of the ground truth rvec.
+
+    Returns:
+        expected        (int):              markers rendered
+        found           (int):              rendered markers detected
+        false_positives (int):              detected ids which were not rendered
+        distance_errors (numpy.ndarray):    |distance - |tvec|| of each found marker (m)
+        position_errors (numpy.ndarray):    camera_link position error of each found marker (m)
+        yaw_errors      (numpy.ndarray):    absolute yaw error of each found marker (radians)
+    '''
+
+    expected = found = false_positives = 0
+    distance_errors, position_errors, yaw_errors = [], [], []
+    for (center_aruco_list, distance_from_rgb_list, angle_aruco_list, width_aruco_list, ids), truth in results:
+        truth = {marker_id: (tvec, rvec) for marker_id, tvec, rvec in truth}
+        expected += len(truth)
+        positions = back_project_batch(center_aruco_list, distance_from_rgb_list, detector)
+        for marker_id, distance, angle, position in zip(ids, distance_from_rgb_list, angle_aruco_list, positions):
+            if marker_id not in truth:
+                false_positives += 1
+                continue
+            found += 1
+            tvec, rvec = truth[marker_id]
+            # optical frame (x right, y down, z forward) to camera_link (x forward, y left, z up)
+            truth_position = np.array([tvec[2], -tvec[0], -tvec[1]])
+            distance_errors.append(abs(distance - np.linalg.norm(tvec)))
+            position_errors.append(np.linalg.norm(position - truth_position))
+            yaw_errors.append(abs(math.remainder(angle - marker_yaw_batch(rvec)[0], 2 * math.pi)))
+
+    return expected, found, false_positives, np.array(distance_errors), np.array(position_errors), np.array(yaw_errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--images', help='directory of images')
+    source.add_argument('--video', help='video file')
+    source.add_argument('--synthetic', type=int, default=200, help='number of synthetic frames (default)')
+    parser.add_argument('--markers', type=int, default=6, help='markers per synthetic frame')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic generator')
+    parser.add_argument('--loop', action='store_true', help='use the per marker loop instead of the batched path')
+    parser.add_argument('--draw', action='store_true', help='draw detections on the frames, as the node does with a display')
+    parser.add_argument('--pyramid-scale', type=float, default=1.0, help='coarse detection scale (Ex: 0.5), 1.0 for full resolution')
+    parser.add_argument('--refine-window', type=int, default=5, help='half size of the corner refinement window of coarse detection')
+    args = parser.parse_args()
+
+    detector = ArucoDetector(batched=not args.loop, pyramid_scale=args.pyramid_scale, refine_window=args.refine_window)
+
+    if args.images:
+        detector.color_encoding = 'bgr8'
+        frames = list(image_dir_source(args.images))
+    elif args.video:
+        detector.color_encoding = 'bgr8'
+        frames = list(video_source(args.video))
+    else:
+        frames = list(synthetic_source(detector, args.synthetic, args.markers, args.seed))
+
+    if not frames:
+        sys.exit('No frames to benchmark')
+
+    # warm up so one time allocations do not show up in the latency
+    detector.detect(frames[0][0].copy())
+
+    timer, results = run(detector, frames, args.draw)
+
+    # tracemalloc hooks every allocation and would inflate the latencies, peak memory is measured by a separate untimed pass
+    tracemalloc.start()
+    run(detector, frames, args.draw)
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f'{len(frames)} frames, {"loop" if args.loop else "batched"} detection, pyramid scale {args.pyramid_scale}')
+    print(f'{"stage":<18}{"p50 ms":>10}{"p99 ms":>10}')
+    for name in ('grayscale', 'detection', 'area_filter', 'pose', 'angle_correction', 'quaternion', 'back_projection', 'total'):
+        if timer.samples[name]:
+            p50, p99 = percentiles_ms(timer.samples[name])
+            print(f'{name:<18}{p50:>10.3f}{p99:>10.3f}')
+
+    print(f'throughput: {len(frames) / sum(timer.samples["total"]):.1f} fps')
+    print(f'peak traced memory: {peak_bytes / 2**20:.1f} MiB, max RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB')
+
+    if results[0][1] is not None:
+        expected, found, false_positives, distance_errors, position_errors, yaw_errors = accuracy(results, detector)
+        print(f'detection rate: {found / expected:.3f} ({found}/{expected}), false positives: {false_positives}')
+        if distance_errors.size:
+            print(f'distance error: mean {distance_errors.mean() * 1000:.1f} mm, p99 {np.percentile(distance_errors, 99) * 1000:.1f} mm')
+            print(f'position error: mean {position_errors.mean() * 1000:.1f} mm, p99 {np.percentile(position_errors, 99) * 1000:.1f} mm')
+            print(f'yaw error: mean {np.degrees(yaw_errors.mean()):.2f} deg, p99 {np.degrees(np.percentile(yaw_errors, 99)):.2f} deg')
+
+
+if __name__ == '__main__':
+    main()
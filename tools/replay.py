@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+
+'''
+Description:    Deterministic replay of recorded camera data through the aruco_tf node, without Gazebo.
+
+                Colour, depth and camera info messages are read from a rosbag2 recording (or an image sequence
+                stand-in) and handed straight to colorimagecb() / depthimagecb() / camerainfocb(); every colour frame is
+                processed synchronously before the next message is read. /tf and /tf_static of the bag are fed to the
+                tf buffer of the node. Transforms are stamped with the image header stamps (batch_tf_publish) and base_link
+                poses are composed locally (local_tf_composition), so two runs on the same input write the same
+                2029_cam_* / 2029_base_* transforms to the output file, byte for byte.
+
+                Replays as fast as possible by default (max sustainable fps), or paced on the header stamps with --time-scale.
+
+Usage:          ros2 bag record -o <bag> /camera/color/image_raw /camera/aligned_depth_to_color/image_raw /camera/camera_info /tf /tf_static
+                python3 tools/replay.py --bag <bag> --output tf.jsonl [--time-scale 1.0]
+                python3 tools/replay.py --images <dir> [--depth <dir>] [--fps 30] [--camera-info-yaml <file>] --output tf.jsonl
+'''
+
+import os
+import sys
+import glob
+import time
+import argparse
+
+import cv2
+import rclpy
+from rclpy.parameter import Parameter
+from rclpy.serialization import deserialize_message
+from rosidl_runtime_py.utilities import get_message
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from task1a import aruco_tf
+from bench_executor import to_image_msg
+
+
+COLOR_TOPIC = '/camera/color/image_raw'
+DEPTH_TOPIC = '/camera/aligned_depth_to_color/image_raw'
+CAMERA_INFO_TOPIC = '/camera/camera_info'
+TF_TOPICS = ('/tf', '/tf_static')
+
+
+def stamp_seconds(stamp):
+    return stamp.sec + stamp.nanosec * 1e-9
+
+
+def bag_source(path, storage_id):
+    '''
+    Description:    Messages of the camera and tf topics of a rosbag2 recording, in recording order
+
+    Yields:
+        topic       (str):      topic name
+        msg         (object):   deserialized message
+    '''
+
+    import rosbag2_py
+
+    reader = rosbag2_py.SequentialReader()
+    reader.open(rosbag2_py.StorageOptions(uri=path, storage_id=storage_id), rosbag2_py.ConverterOptions('', ''))
+    topic_types = {topic.name: topic.type for topic in reader.get_all_topics_and_types()}
+    topics = [topic for topic in (COLOR_TOPIC, DEPTH_TOPIC, CAMERA_INFO_TOPIC) + TF_TOPICS if topic in topic_types]
+    reader.set_filter(rosbag2_py.StorageFilter(topics=topics))
+
+    msg_types = {topic: get_message(topic_types[topic]) for topic in topics}
+    while reader.has_next():
+        topic, data, _ = reader.read_next()
+        yield topic, deserialize_message(data, msg_types[topic])
+
+
+def image_sequence_source(color_dir, depth_dir, fps):
+    '''
+    Description:    Image sequence stand-in for a bag. Frames are sorted by file name and stamped at a fixed rate from
+                    1 s after the epoch (a zero stamp means unstamped); depth images (16 bit, mm) are matched to colour
+                    images by position in the sorted list.
+
+    Yields:
+        topic       (str):      topic name
+        msg         (Image):    colour or depth image message
+    '''
+
+    color_files = sorted(glob.glob(os.path.join(color_dir, '*')))
+    depth_files = sorted(glob.glob(os.path.join(depth_dir, '*'))) if depth_dir else []
+    period_ns = int(round(1e9 / fps))
+
+    for index, filename in enumerate(color_files):
+        stamp_ns = 10**9 + index * period_ns
+        if index < len(depth_files):
+            depth = cv2.imread(depth_files[index], cv2.IMREAD_ANYDEPTH)
+            if depth is not None:
+                yield DEPTH_TOPIC, to_image_msg(depth, '16UC1' if depth.dtype != 'float32' else '32FC1', stamp_ns, 'camera_link')
+        color = cv2.imread(filename)
+        if color is not None:
+            yield COLOR_TOPIC, to_image_msg(color, 'bgr8', stamp_ns, 'camera_link')
+
+
+def replay(node, messages, time_scale):
+    '''
+    Description:    Feed messages to the node callbacks, processing each colour frame before reading on
+
+    Args:
+        node        (aruco_tf):     node under test (not spun)
+        messages    (iterable):     (topic, msg) pairs
+        time_scale  (float):        replay speed relative to the header stamps, 0 for as fast as possible
+
+    Returns:
+        frames      (int):          colour frames processed
+        busy        (float):        seconds spent in callbacks and processing (excludes pacing sleeps)
+    '''
+
+    frames = 0
+    busy = 0.0
+    first_stamp = start = None
+
+    for topic, msg in messages:
+        if topic in TF_TOPICS:
+            for t in msg.transforms:
+                if topic == '/tf_static':
+                    node.tf_buffer.set_transform_static(t, 'replay')
+                else:
+                    node.tf_buffer.set_transform(t, 'replay')
+            continue
+        if topic == CAMERA_INFO_TOPIC:
+            node.camerainfocb(msg)
+            continue
+
+        # the node would stamp unstamped frames with the wall clock, and the output could not be compared between runs
+        stamp = stamp_seconds(msg.header.stamp)
+        if stamp == 0:
+            raise ValueError(f'Unstamped message on {topic}, replay needs header stamps to be deterministic')
+
+        if time_scale > 0:
+            if first_stamp is None:
+                first_stamp, start = stamp, time.monotonic()
+            delay = start + (stamp - first_stamp) / time_scale - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+        tick = time.perf_counter()
+        if topic == DEPTH_TOPIC:
+            node.depthimagecb(msg)
+        else:
+            node.colorimagecb(msg)
+            frame = node.frame_queue.get(timeout=0)
+            if frame is not None:
+                node.process_frame(*frame)
+                node.frame_queue.task_done()
+                frames += 1
+        busy += time.perf_counter() - tick
+
+    return frames, busy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--bag', help='rosbag2 recording')
+    source.add_argument('--images', help='directory of colour images, stand-in for a bag')
+    parser.add_argument('--storage-id', default='', help='rosbag2 storage plugin (Ex: sqlite3, mcap), detected when empty')
+    parser.add_argument('--depth', help='directory of 16 bit depth images (mm) matching --images')
+    parser.add_argument('--fps', type=float, default=30.0, help='stamp rate of --images frames')
+    parser.add_argument('--camera-info-yaml', default='', help='calibration yaml, for --images or bags without camera info')
+    parser.add_argument('--output', required=True, help='JSON lines file receiving the published transforms')
+    parser.add_argument('--time-scale', type=float, default=0.0, help='replay speed relative to recording, 0 for as fast as possible')
+    parser.add_argument('--tracking', action='store_true', help='enable marker tracking')
+    parser.add_argument('--depth-fusion', default='off', help='depth_fusion parameter of the node')
+    args = parser.parse_args()
+
+    rclpy.init()
+    node = aruco_tf(parameter_overrides=[Parameter('tf_output_file', value=args.output),
+                                         Parameter('batch_tf_publish', value=True),
+                                         Parameter('local_tf_composition', value=True),
+                                         Parameter('visualization', value='off'),
+                                         Parameter('diagnostics_period', value=0.0),
+                                         Parameter('camera_info_yaml', value=args.camera_info_yaml),
+                                         Parameter('tracking', value=args.tracking),
+                                         Parameter('depth_fusion', value=args.depth_fusion)])
+
+    if args.bag:
+        messages = bag_source(args.bag, args.storage_id)
+    else:
+        messages = image_sequence_source(args.images, args.depth, args.fps)
+
+    try:
+        start = time.perf_counter()
+        frames, busy = replay(node, messages, args.time_scale)
+        elapsed = time.perf_counter() - start
+    except ValueError as e:
+        sys.exit(str(e))
+    finally:
+        node.destroy_node()
+        rclpy.shutdown()
+
+    print(f'{frames} frames in {elapsed:.2f} s ({frames / elapsed if elapsed else 0.0:.1f} fps wall clock)')
+    if busy:
+        print(f'max sustainable rate: {frames / busy:.1f} fps')
+    print(f'transforms written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()